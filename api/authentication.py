@@ -0,0 +1,73 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from governanceplatform.caching import API_TOKEN_CACHE, get_or_compute
+from governanceplatform.models import ApiToken, User
+
+# the tokens deleted or changed are removed from the cache by the signals,
+# the timeout limits the use of a token once expired
+API_TOKEN_CACHE_TIMEOUT = 60
+
+# only these fields of the token and of its user are cached, never the digest or
+# the password hash of the user
+API_TOKEN_FIELDS = ["id", "user_id", "scope", "expires_at"]
+API_TOKEN_USER_FIELDS = {
+    "user__id": "id",
+    "user__is_active": "is_active",
+    "user__is_staff": "is_staff",
+}
+
+
+def get_api_token_data(digest):
+    return (
+        ApiToken.objects.filter(digest=digest)
+        .values(*API_TOKEN_FIELDS, *API_TOKEN_USER_FIELDS)
+        .first()
+    )
+
+
+# instance loaded with the given fields, the other fields are loaded when used
+def get_deferred_instance(model, data):
+    field_names = [
+        field.attname for field in model._meta.concrete_fields if field.attname in data
+    ]
+    return model.from_db(None, field_names, [data[name] for name in field_names])
+
+
+class ApiTokenAuthentication(TokenAuthentication):
+    """
+    Authentication with an API token given in the header
+    "Authorization: Token <key>".
+
+    The key is checked with its keyed digest instead of a password hash, and the
+    fields of the tokens checked are cached for a minute, so the calls cost no
+    hashing and no query.
+    """
+
+    model = ApiToken
+
+    def authenticate_credentials(self, key):
+        digest = ApiToken.get_digest(key)
+        data = get_or_compute(
+            API_TOKEN_CACHE,
+            [digest],
+            lambda: get_api_token_data(digest),
+            API_TOKEN_CACHE_TIMEOUT,
+        )
+
+        if data is None:
+            raise AuthenticationFailed(_("Invalid token."))
+        token = get_deferred_instance(
+            ApiToken, {field: data[field] for field in API_TOKEN_FIELDS}
+        )
+        if token.is_expired():
+            raise AuthenticationFailed(_("Token has expired."))
+        token.user = get_deferred_instance(
+            User,
+            {field: data[key] for key, field in API_TOKEN_USER_FIELDS.items()},
+        )
+        if not token.user.is_active:
+            raise AuthenticationFailed(_("User inactive or deleted."))
+
+        return (token.user, token)
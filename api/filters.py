@@ -0,0 +1,16 @@
+import django_filters
+
+from governanceplatform.models import Sector
+from incidents.filters import IncidentFilter
+from incidents.models import SectorRegulation
+
+
+# same filters as the incidents list, the sectors and the regulations are given by
+# id and are not limited to the ones translated in the current language
+class IncidentApiFilter(IncidentFilter):
+    affected_sectors = django_filters.ModelMultipleChoiceFilter(
+        queryset=Sector.objects.all()
+    )
+    sector_regulation = django_filters.ModelChoiceFilter(
+        queryset=SectorRegulation.objects.all()
+    )
@@ -0,0 +1,272 @@
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def encode_cursor(*values):
+    cursor = "|".join(str(value) for value in values)
+    return b64encode(cursor.encode("ascii")).decode("ascii")
+
+
+def decode_cursor(encoded):
+    """Return the values of the cursor as strings, raise ValueError if invalid."""
+    try:
+        return b64decode(encoded.encode("ascii")).decode("ascii").split("|")
+    except (BinasciiError, UnicodeError) as e:
+        raise ValueError(e)
+
+
+def decode_cursor_date(value):
+    date = parse_datetime(value)
+    if date is None:
+        raise ValueError(value)
+    return date
+
+
+def get_page_size(paginator, request):
+    try:
+        page_size = int(request.query_params[paginator.page_size_query_param])
+    except (KeyError, ValueError):
+        return paginator.page_size
+    if page_size <= 0:
+        return paginator.page_size
+    return min(page_size, paginator.max_page_size)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginate a queryset ordered by a date field and the id.
+
+    The cursor is the date and the id of the last object of the page, the next page
+    is filtered on the objects after it, so each page costs the same, whatever its
+    position, and the objects created while the client is paginating are not missed.
+    """
+
+    date_field = "incident_notification_date"
+    cursor_query_param = "cursor"
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    invalid_cursor_message = _("Invalid cursor")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(self.date_field, "id")
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            date, pk = cursor
+            queryset = queryset.filter(
+                Q(**{f"{self.date_field}__gt": date})
+                | Q(**{self.date_field: date, "id__gt": pk})
+            )
+
+        # one more object tells if there is a next page
+        results = list(queryset[: self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        return get_page_size(self, request)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            date, pk = decode_cursor(encoded)
+            return decode_cursor_date(date), int(pk)
+        except ValueError:
+            raise ValidationError(
+                {self.cursor_query_param: [self.invalid_cursor_message]}
+            )
+
+    def encode_cursor(self, obj):
+        return encode_cursor(getattr(obj, self.date_field).isoformat(), obj.id)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {
+                    "type": "string",
+                    "nullable": True,
+                    "format": "uri",
+                },
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The pagination cursor value.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results to return per page.",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+
+class ChangeFeedPagination(BasePagination):
+    """
+    Paginate the changes of several querysets by updated_at.
+
+    The changes are ordered by date, type and id. The cursor is the position of the
+    last change returned, the client keeps it to fetch the next changes. The
+    changes of the last seconds are not returned yet, their transaction may not be
+    committed and they could be returned after a later change.
+    """
+
+    cursor_query_param = "cursor"
+    since_query_param = "since"
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    settle_delay = timedelta(seconds=30)
+    invalid_cursor_message = _("Invalid cursor")
+    invalid_since_message = _("Invalid date")
+
+    def paginate_querysets(self, querysets, request, view=None):
+        """
+        Return the next (type, object) changes of the querysets, given by type.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.types = list(querysets)
+        self.position = self.decode_position(request)
+        until = timezone.now() - self.settle_delay
+
+        changes = []
+        for type_index, queryset in enumerate(querysets.values()):
+            queryset = queryset.filter(
+                self.get_after_position_filter(type_index), updated_at__lte=until
+            ).order_by("updated_at", "id")
+            changes += [
+                (obj.updated_at, type_index, obj.id, obj)
+                for obj in queryset[: self.page_size + 1]
+            ]
+
+        # one more change of a type tells if there are next changes
+        changes.sort(key=lambda change: change[:3])
+        self.has_next = len(changes) > self.page_size
+        changes = changes[: self.page_size]
+        if changes:
+            self.position = changes[-1][:3]
+
+        return [(self.types[type_index], obj) for _d, type_index, _id, obj in changes]
+
+    def get_page_size(self, request):
+        return get_page_size(self, request)
+
+    def decode_position(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is not None:
+            try:
+                date, type_index, pk = decode_cursor(encoded)
+                return decode_cursor_date(date), int(type_index), int(pk)
+            except ValueError:
+                raise ValidationError(
+                    {self.cursor_query_param: [self.invalid_cursor_message]}
+                )
+
+        since = request.query_params.get(self.since_query_param)
+        if since is not None:
+            try:
+                # the changes at the date are included
+                return decode_cursor_date(since), -1, 0
+            except ValueError:
+                raise ValidationError(
+                    {self.since_query_param: [self.invalid_since_message]}
+                )
+        return None
+
+    def get_after_position_filter(self, type_index):
+        if self.position is None:
+            return Q()
+        date, position_type_index, pk = self.position
+        if type_index < position_type_index:
+            return Q(updated_at__gt=date)
+        if type_index > position_type_index:
+            return Q(updated_at__gte=date)
+        return Q(updated_at__gt=date) | Q(updated_at=date, id__gt=pk)
+
+    def get_cursor(self):
+        if self.position is None:
+            return None
+        date, type_index, pk = self.position
+        return encode_cursor(date.isoformat(), type_index, pk)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.since_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.get_cursor())
+
+    def get_paginated_response(self, data):
+        headers = {}
+        cursor = self.get_cursor()
+        if cursor is not None:
+            headers["X-Cursor"] = cursor
+        next_link = self.get_next_link()
+        if next_link is not None:
+            headers["Link"] = f'<{next_link}>; rel="next"'
+        return Response(data, headers=headers)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The cursor returned in the X-Cursor header.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.since_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Date of the first changes, without cursor.",
+                "schema": {"type": "string", "format": "date-time"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of changes to return per page.",
+                "schema": {"type": "integer"},
+            },
+        ]
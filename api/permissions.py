@@ -0,0 +1,15 @@
+from rest_framework.permissions import SAFE_METHODS, BasePermission
+
+from governanceplatform.models import ApiToken
+
+
+class HasApiTokenScope(BasePermission):
+    """
+    The API tokens with the read scope only allow the safe methods, the other
+    authentications are not limited.
+    """
+
+    def has_permission(self, request, view):
+        if not isinstance(request.auth, ApiToken):
+            return True
+        return request.method in SAFE_METHODS or request.auth.scope == "write"
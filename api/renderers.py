@@ -0,0 +1,25 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils import encoders
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Render a list as newline delimited JSON, an item by line.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        # the errors are a single object
+        if not isinstance(data, list):
+            data = [data]
+        return "".join(
+            json.dumps(item, cls=encoders.JSONEncoder, ensure_ascii=False) + "\n"
+            for item in data
+        ).encode("utf-8")
@@ -3,7 +3,18 @@ from parler_rest.serializers import TranslatableModelSerializer
 from rest_framework import serializers
 
 from governanceplatform.models import Company, Regulation, Service, User
-from incidents.models import Incident
+from incidents.models import Incident, IncidentWorkflow
+
+
+# serializer of which the fields can be selected with the fields argument
+class DynamicFieldsMixin:
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
 
 
 #
@@ -73,7 +84,7 @@ class ServiceSerializer(TranslatableModelSerializer):
 # Model: Regulation
 #
 class RegulationSerializer(TranslatableModelSerializer):
-    translations = TranslatedFieldsField(shared_model=Service)
+    translations = TranslatedFieldsField(shared_model=Regulation)
 
     class Meta:
         model = Regulation
@@ -85,16 +96,39 @@ class RegulationSerializer(TranslatableModelSerializer):
 #
 # Model: Incident
 #
-class IncidentSerializer(serializers.ModelSerializer):
+class IncidentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     affected_services = ServiceSerializer(read_only=True, many=True)
-    regulations = RegulationSerializer(read_only=True, many=True)
+    regulation = RegulationSerializer(
+        source="sector_regulation.regulation", read_only=True, allow_null=True
+    )
 
     class Meta:
         model = Incident
         fields = [
+            "id",
             "incident_id",
+            "incident_notification_date",
+            "incident_status",
+            "review_status",
             "company_name",
             "affected_services",
-            "regulations",
+            "regulation",
             "is_significative_impact",
+            "updated_at",
+        ]
+
+
+#
+# Model: IncidentWorkflow
+#
+class IncidentWorkflowSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = IncidentWorkflow
+        fields = [
+            "id",
+            "incident",
+            "workflow",
+            "timestamp",
+            "review_status",
+            "updated_at",
         ]
@@ -0,0 +1,78 @@
+import csv
+import json
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils import encoders
+
+EXPORT_QUERY_PARAM = "export"
+# number of rows fetched at once by the server-side cursor
+EXPORT_CHUNK_SIZE = 2000
+
+
+# file-like object returning the line written by the csv writer
+class Echo:
+    def write(self, value):
+        return value
+
+
+# same escaping of the formulae as the exports of the admin
+def escape_csv_value(value):
+    value = "" if value is None else str(value)
+    if settings.IMPORT_EXPORT_ESCAPE_FORMULAE_ON_EXPORT and value.startswith("="):
+        return value[1:]
+    return value
+
+
+def iterate_representations(queryset, serializer_class):
+    # one serializer for all the rows, the rows are fetched by chunks
+    serializer = serializer_class()
+    for obj in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield serializer.to_representation(obj)
+
+
+def stream_jsonl(queryset, serializer_class):
+    for data in iterate_representations(queryset, serializer_class):
+        yield json.dumps(data, cls=encoders.JSONEncoder, ensure_ascii=False) + "\n"
+
+
+def stream_csv(queryset, serializer_class):
+    fields = serializer_class.Meta.fields
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for data in iterate_representations(queryset, serializer_class):
+        yield writer.writerow([escape_csv_value(data[field]) for field in fields])
+
+
+EXPORT_FORMATS = {
+    "jsonl": (stream_jsonl, "application/jsonl"),
+    "csv": (stream_csv, "text/csv"),
+}
+
+
+def get_export_response(request, queryset, serializer_class, filename):
+    """
+    Return the rows of the queryset as a streamed JSON Lines or CSV file if an
+    export is requested, or None.
+
+    The rows are serialized as the response is sent, so the memory used does not
+    depend on the number of rows.
+    """
+    export_format = request.query_params.get(EXPORT_QUERY_PARAM)
+    if export_format is None:
+        return None
+    if export_format not in EXPORT_FORMATS:
+        raise ValidationError(
+            {EXPORT_QUERY_PARAM: [_("Export format must be jsonl or csv.")]}
+        )
+
+    stream, content_type = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(
+        stream(queryset.order_by("pk"), serializer_class), content_type=content_type
+    )
+    response[
+        "Content-Disposition"
+    ] = f'attachment; filename="{filename}.{export_format}"'
+    return response
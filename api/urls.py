@@ -8,6 +8,7 @@ from drf_spectacular.views import (
 from .views import (
     CompanyApiView,
     IncidentApiView,
+    IncidentChangeApiView,
     UserApiElemView,
     UserApiView,
     UserElementApiView,
@@ -26,4 +27,5 @@ urlpatterns = [
     path("user/<int:id>", UserApiElemView.as_view()),
     path("company/", CompanyApiView.as_view()),
     path("incident/", IncidentApiView.as_view()),
+    path("incident/changes/", IncidentChangeApiView.as_view()),
 ]
@@ -1,20 +1,39 @@
-from drf_spectacular.utils import extend_schema
+from django.utils.translation import gettext_lazy as _
+from django_filters.rest_framework import DjangoFilterBackend
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
 from rest_framework import status
 from rest_framework.authentication import BasicAuthentication, SessionAuthentication
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import GenericAPIView
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from governanceplatform.models import Company, User
-from incidents.models import Incident
+from incidents.models import Incident, IncidentWorkflow
 
+from .authentication import ApiTokenAuthentication
+from .filters import IncidentApiFilter
+from .pagination import ChangeFeedPagination, KeysetPagination
+from .permissions import HasApiTokenScope
+from .renderers import NDJSONRenderer
 from .serializers import (
     CompanySerializer,
     IncidentSerializer,
+    IncidentWorkflowSerializer,
     UserInputSerializer,
     UserSerializer,
 )
+from .streaming import EXPORT_FORMATS, EXPORT_QUERY_PARAM, get_export_response
+
+# streamed export of all the objects instead of the JSON list
+EXPORT_PARAMETER = OpenApiParameter(
+    EXPORT_QUERY_PARAM,
+    OpenApiTypes.STR,
+    enum=list(EXPORT_FORMATS),
+    description="Stream all the objects as a JSON Lines or CSV file.",
+)
 
 
 #
@@ -22,15 +41,24 @@ from .serializers import (
 #
 class UserApiView(APIView):
     # add permission to check if user is authenticated
-    authentication_classes = [SessionAuthentication, BasicAuthentication]
-    permission_classes = [IsAuthenticated, IsAdminUser]
-
-    @extend_schema(request=None, responses=UserSerializer)
+    authentication_classes = [
+        ApiTokenAuthentication,
+        SessionAuthentication,
+        BasicAuthentication,
+    ]
+    permission_classes = [IsAuthenticated, IsAdminUser, HasApiTokenScope]
+
+    @extend_schema(
+        request=None, responses=UserSerializer, parameters=[EXPORT_PARAMETER]
+    )
     def get(self, request, *args, **kwargs):
         """
         List all the users.
         """
         objects = User.objects.all()
+        response = get_export_response(request, objects, UserSerializer, "users")
+        if response is not None:
+            return response
         serializer = UserSerializer(objects, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -50,8 +78,12 @@ class UserApiView(APIView):
 
 class UserElementApiView(APIView):
     # add permission to check if user is authenticated
-    authentication_classes = [SessionAuthentication, BasicAuthentication]
-    permission_classes = [IsAuthenticated, IsAdminUser]
+    authentication_classes = [
+        ApiTokenAuthentication,
+        SessionAuthentication,
+        BasicAuthentication,
+    ]
+    permission_classes = [IsAuthenticated, IsAdminUser, HasApiTokenScope]
     serializer_class = UserSerializer
 
     def delete(self, request, id=None):
@@ -65,8 +97,12 @@ class UserElementApiView(APIView):
 
 class UserApiElemView(GenericAPIView):
     # add permission to check if user is authenticated
-    authentication_classes = [SessionAuthentication, BasicAuthentication]
-    permission_classes = [IsAuthenticated, IsAdminUser]
+    authentication_classes = [
+        ApiTokenAuthentication,
+        SessionAuthentication,
+        BasicAuthentication,
+    ]
+    permission_classes = [IsAuthenticated, IsAdminUser, HasApiTokenScope]
     serializer_class = UserSerializer
 
     @extend_schema(request=UserInputSerializer, responses=UserSerializer)
@@ -88,15 +124,24 @@ class UserApiElemView(GenericAPIView):
 #
 class CompanyApiView(APIView):
     # add permission to check if user is authenticated
-    authentication_classes = [SessionAuthentication, BasicAuthentication]
-    permission_classes = [IsAuthenticated, IsAdminUser]
-
-    @extend_schema(request=None, responses=CompanySerializer)
+    authentication_classes = [
+        ApiTokenAuthentication,
+        SessionAuthentication,
+        BasicAuthentication,
+    ]
+    permission_classes = [IsAuthenticated, IsAdminUser, HasApiTokenScope]
+
+    @extend_schema(
+        request=None, responses=CompanySerializer, parameters=[EXPORT_PARAMETER]
+    )
     def get(self, request, *args, **kwargs):
         """
         List all the companies.
         """
         objects = Company.objects.all()
+        response = get_export_response(request, objects, CompanySerializer, "companies")
+        if response is not None:
+            return response
         serializer = CompanySerializer(objects, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -104,16 +149,100 @@ class CompanyApiView(APIView):
 #
 # Model: Incident
 #
-class IncidentApiView(APIView):
+def get_incident_queryset(fields=None):
+    queryset = Incident.objects.all()
+    # only the related objects of the selected fields are fetched
+    if fields is None or "affected_services" in fields:
+        queryset = queryset.prefetch_related("affected_services__translations")
+    if fields is None or "regulation" in fields:
+        queryset = queryset.select_related(
+            "sector_regulation__regulation"
+        ).prefetch_related("sector_regulation__regulation__translations")
+    return queryset
+
+
+class IncidentApiView(GenericAPIView):
     # add permission to check if user is authenticated
-    authentication_classes = [SessionAuthentication, BasicAuthentication]
-    permission_classes = [IsAuthenticated, IsAdminUser]
+    authentication_classes = [
+        ApiTokenAuthentication,
+        SessionAuthentication,
+        BasicAuthentication,
+    ]
+    permission_classes = [IsAuthenticated, IsAdminUser, HasApiTokenScope]
+    serializer_class = IncidentSerializer
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = IncidentApiFilter
+
+    def get_fields(self):
+        fields = self.request.query_params.get("fields")
+        if not fields:
+            return None
+        fields = [field.strip() for field in fields.split(",")]
+        unknown_fields = [
+            field for field in fields if field not in IncidentSerializer.Meta.fields
+        ]
+        if unknown_fields:
+            raise ValidationError(
+                {"fields": [_("Unknown fields: %s") % ", ".join(unknown_fields)]}
+            )
+        return fields
+
+    def get_queryset(self):
+        return get_incident_queryset(self.get_fields())
+
+    @extend_schema(
+        request=None,
+        responses=IncidentSerializer(many=True),
+        parameters=[
+            OpenApiParameter(
+                "fields",
+                OpenApiTypes.STR,
+                description="Comma separated list of the fields to return.",
+            ),
+        ],
+    )
+    def get(self, request, *args, **kwargs):
+        """
+        List the incidents by notification date, a page at a time.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True, fields=self.get_fields())
+        return self.get_paginated_response(serializer.data)
+
 
-    @extend_schema(request=None, responses=IncidentSerializer)
+class IncidentChangeApiView(GenericAPIView):
+    # add permission to check if user is authenticated
+    authentication_classes = [
+        ApiTokenAuthentication,
+        SessionAuthentication,
+        BasicAuthentication,
+    ]
+    permission_classes = [IsAuthenticated, IsAdminUser, HasApiTokenScope]
+    renderer_classes = [NDJSONRenderer]
+    pagination_class = ChangeFeedPagination
+    serializer_classes = {
+        "incident": IncidentSerializer,
+        "report": IncidentWorkflowSerializer,
+    }
+
+    @extend_schema(request=None, responses={(200, "application/x-ndjson"): str})
     def get(self, request, *args, **kwargs):
         """
-        List all the incidents.
+        List the incidents and the incident reports changed since the cursor, a
+        change by line.
         """
-        objects = Incident.objects.all()
-        serializer = IncidentSerializer(objects, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        changes = self.paginator.paginate_querysets(
+            {
+                "incident": get_incident_queryset(),
+                "report": IncidentWorkflow.objects.all(),
+            },
+            request,
+            view=self,
+        )
+        data = [
+            {"type": change_type, **self.serializer_classes[change_type](obj).data}
+            for change_type, obj in changes
+        ]
+        return self.get_paginated_response(data)
@@ -21,8 +21,9 @@ from .helpers import (
     is_user_regulator,
     user_in_group,
 )
-from .mixins import TranslationUpdateMixin
+from .mixins import TranslationPrefetchAdminMixin, TranslationUpdateMixin
 from .models import (  # Functionality,; OperatorType,; Service,
+    ApiToken,
     Company,
     Observer,
     ObserverUser,
@@ -59,7 +60,7 @@ class CustomAdminSite(admin.AdminSite):
 admin_site = CustomAdminSite()
 
 
-class CustomTranslatableAdmin(TranslatableAdmin):
+class CustomTranslatableAdmin(TranslationPrefetchAdminMixin, TranslatableAdmin):
     form = CustomTranslatableAdminForm
 
 
@@ -67,7 +68,9 @@ class NestedTranslatableAdmin(NestedModelAdminMixin, CustomTranslatableAdmin):
     form = CustomTranslatableAdminForm
 
 
-class CustomTranslatableTabularInline(TranslatableTabularInline):
+class CustomTranslatableTabularInline(
+    TranslationPrefetchAdminMixin, TranslatableTabularInline
+):
     form = CustomTranslatableAdminForm
 
 
@@ -80,6 +83,49 @@ class SiteAdmin(admin.ModelAdmin):
         return super().has_module_permission(request)
 
 
+@admin.register(ApiToken, site=admin_site)
+class ApiTokenAdmin(admin.ModelAdmin):
+    list_display = ["name", "user", "prefix", "scope", "created_at", "expires_at"]
+    list_filter = ["scope"]
+    search_fields = ["name", "prefix", "user__email"]
+    fields = ["name", "user", "scope", "expires_at", "prefix"]
+    readonly_fields = ["prefix"]
+    autocomplete_fields = ["user"]
+
+    def has_module_permission(self, request):
+        user = request.user
+        if not user.is_superuser and not user_in_group(user, "PlatformAdmin"):
+            return False
+        return super().has_module_permission(request)
+
+    # the users the admin can manage, as in the users admin
+    def get_user_queryset(self, request):
+        user_admin = self.admin_site.get_model_admin(User)
+        return User.objects.filter(pk__in=user_admin.get_queryset(request).values("pk"))
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return queryset.filter(user__in=self.get_user_queryset(request))
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == "user":
+            kwargs["queryset"] = self.get_user_queryset(request)
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def save_model(self, request, obj, form, change):
+        key = None
+        if not change:
+            key = obj.set_key()
+        super().save_model(request, obj, form, change)
+        if key is not None:
+            messages.add_message(
+                request,
+                messages.WARNING,
+                _("The key of the token is %(key)s, it will not be shown again.")
+                % {"key": key},
+            )
+
+
 class SectorResource(TranslationUpdateMixin, resources.ModelResource):
     id = fields.Field(column_name="id", attribute="id", readonly=True)
 
@@ -0,0 +1,84 @@
+import time
+
+from django.core.cache import cache
+from django.utils import translation
+
+# The reference data rarely changes and is cached in the shared cache (see CACHES
+# in the configuration). Each namespace has a version, the cache keys include it
+# and the signals change it when the data is saved, so all the processes stop
+# reading the outdated values at once. The versions are kept in the process for
+# CACHE_VERSION_TTL, the other processes stop reading them after this delay.
+
+# namespaces of the reference data, invalidated by the signals of the models
+REGULATOR_CHOICES_CACHE = "regulator_choices"
+REGULATION_CHOICES_CACHE = "regulation_choices"
+SECTOR_CHOICES_CACHE = "sector_choices"
+IMPACT_CHOICES_CACHE = "impact_choices"
+# the API tokens checked recently
+API_TOKEN_CACHE = "api_token"
+
+# number of seconds a version read in the shared cache is kept in the process
+CACHE_VERSION_TTL = 1
+# versions of the namespaces read by the process, with the monotonic time of the read
+cache_versions = {}
+
+
+def get_cache_version_key(namespace):
+    return f"{namespace}_version"
+
+
+def get_cache_version(namespace):
+    """Return the current version of the namespace."""
+    now = time.monotonic()
+    version, read_at = cache_versions.get(namespace, (None, 0.0))
+    if version is not None and now - read_at <= CACHE_VERSION_TTL:
+        return version
+
+    version_key = get_cache_version_key(namespace)
+    version = cache.get(version_key)
+    if version is None:
+        version = time.time_ns()
+        # another process may have set the version at the same time
+        if not cache.add(version_key, version, None):
+            version = cache.get(version_key, version)
+    cache_versions[namespace] = (version, now)
+    return version
+
+
+def invalidate_cache(*namespaces):
+    """Invalidate all the values cached in the namespaces, called by the signals."""
+    version = time.time_ns()
+    cache.set_many(
+        {get_cache_version_key(namespace): version for namespace in namespaces}, None
+    )
+    # the process invalidating the values does not wait for the delay
+    for namespace in namespaces:
+        cache_versions.pop(namespace, None)
+
+
+def get_cache_key(namespace, *parts, version=None):
+    if version is None:
+        version = get_cache_version(namespace)
+    return ":".join([namespace, str(version), *(str(part) for part in parts)])
+
+
+def get_or_compute(namespace, parts, compute, timeout=None):
+    """
+    Return the value cached in the namespace for the key parts, the value is
+    computed and cached when it is missing or outdated.
+
+    The value must be picklable, so rather a list or a dict than a queryset.
+    """
+    cache_key = get_cache_key(namespace, *parts)
+    value = cache.get(cache_key)
+    if value is None:
+        value = compute()
+        cache.set(cache_key, value, timeout)
+    return value
+
+
+def get_or_compute_translated(namespace, parts, compute, timeout=None):
+    """Same as get_or_compute, the value is cached by language."""
+    return get_or_compute(
+        namespace, [*parts, translation.get_language()], compute, timeout
+    )
@@ -37,6 +37,22 @@ DATABASES = {
     },
 }
 
+# Cache shared by all the processes, it keeps the reference data of the forms and
+# the versions of the values cached by each process.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": "./cache",
+    },
+}
+# With a Redis server (the redis package must be installed):
+# CACHES = {
+#     "default": {
+#         "BACKEND": "django.core.cache.backends.redis.RedisCache",
+#         "LOCATION": "redis://127.0.0.1:6379",
+#     },
+# }
+
 CSRF_TRUSTED_ORIGINS = []
 CORS_ALLOWED_ORIGINS = []
 CORS_ALLOWED_ORIGIN_REGEXES = []
@@ -16,3 +16,9 @@ ACTION_FLAG_CHOICES = {
     CONNECTION: _('Logged in'),
     # DECONNECTION: _('Logged out'),
 }
+
+# scopes of the API tokens, the read tokens only allow the safe methods
+API_TOKEN_SCOPES = [
+    ("read", _("Read")),
+    ("write", _("Read and write")),
+]
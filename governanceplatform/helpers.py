@@ -1,5 +1,7 @@
+import itertools
 import secrets
-from typing import Any, Optional
+from functools import cached_property
+from typing import Any, Dict, Iterable, Optional
 
 from django.contrib import messages
 from django.db import connection
@@ -9,7 +11,6 @@ from django.utils.translation import gettext_lazy as _
 
 from incidents.models import (
     Answer,
-    Incident,
     PredefinedAnswer,
     Question,
     QuestionCategory,
@@ -30,35 +31,112 @@ def generate_token():
     return secrets.token_urlsafe(32)[:32]
 
 
+class UserRoles:
+    """
+    Groups, regulator, observer, companies and sectors of a user.
+
+    Each value is loaded the first time it is used and kept on the user instance,
+    so for request.user the roles are queried at most once per request.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.version = get_user_roles_version(user)
+
+    @cached_property
+    def group_names(self) -> frozenset:
+        if not self.user.is_authenticated:
+            return frozenset()
+        return frozenset(self.user.groups.values_list("name", flat=True))
+
+    @cached_property
+    def regulator(self):
+        return self.user.regulators.first()
+
+    @cached_property
+    def observer(self):
+        return self.user.observers.first()
+
+    @cached_property
+    def company_ids(self) -> frozenset:
+        return frozenset(self.user.companies.values_list("id", flat=True))
+
+    @cached_property
+    def sector_ids(self) -> frozenset:
+        return frozenset(self.user.get_sectors().values_list("id", flat=True))
+
+    def in_group(self, *group_names) -> bool:
+        return not self.group_names.isdisjoint(group_names)
+
+
+# versions of the roles by user id and of the roles of all the users, changed with
+# the groups, so the roles loaded in every instance of the users are loaded again
+user_roles_versions_counter = itertools.count(1)
+user_roles_versions: Dict[int, int] = {}
+all_user_roles_version = 0
+
+
+def get_user_roles_version(user) -> int:
+    return max(all_user_roles_version, user_roles_versions.get(user.pk, 0))
+
+
+def get_user_roles(user) -> UserRoles:
+    """Return the roles of the user, loaded once for the user instance."""
+    roles = getattr(user, "_user_roles", None)
+    if roles is None or roles.version != get_user_roles_version(user):
+        roles = UserRoles(user)
+        user._user_roles = roles
+    return roles
+
+
+def invalidate_user_roles(user) -> None:
+    """Forget the roles of all the instances of the user, called when its groups change."""
+    invalidate_users_roles([user.pk])
+
+
+def invalidate_users_roles(user_ids: Optional[Iterable[int]] = None) -> None:
+    """
+    Forget the roles of all the instances of the users, or of all the users if
+    user_ids is None, called when the users of a group change.
+    """
+    global all_user_roles_version
+    version = next(user_roles_versions_counter)
+    if user_ids is None:
+        all_user_roles_version = version
+    else:
+        for user_id in user_ids:
+            user_roles_versions[user_id] = version
+
+
 def user_in_group(user, group_name) -> bool:
     """Check user group"""
     if not user.is_authenticated:
         return False
-    return any(user_group.name == group_name for user_group in user.groups.all())
+    return get_user_roles(user).in_group(group_name)
 
 
 def instance_user_in_group(user_instance, group_name) -> bool:
-    return any(
-        user_group.name == group_name for user_group in user_instance.groups.all()
-    )
+    return get_user_roles(user_instance).in_group(group_name)
 
 
 def is_user_regulator(user: User) -> bool:
-    return user_in_group(user, "RegulatorAdmin") or user_in_group(user, "RegulatorUser")
+    return get_user_roles(user).in_group("RegulatorAdmin", "RegulatorUser")
 
 
 def is_user_operator(user: User) -> bool:
-    return user_in_group(user, "OperatorAdmin") or user_in_group(user, "OperatorUser")
+    return get_user_roles(user).in_group("OperatorAdmin", "OperatorUser")
 
 
 def is_observer_user(user: User) -> bool:
-    return user_in_group(user, "ObserverAdmin") or user_in_group(user, "ObserverUser")
+    return get_user_roles(user).in_group("ObserverAdmin", "ObserverUser")
 
 
 def is_observer_user_viewving_all_incident(user: User) -> bool:
+    roles = get_user_roles(user)
     return (
-        user_in_group(user, "ObserverAdmin") or user_in_group(user, "ObserverUser")
-    ) and user.observers.first().is_receiving_all_incident
+        roles.in_group("ObserverAdmin", "ObserverUser")
+        and roles.observer.is_receiving_all_incident
+    )
 
 
 def get_active_company_from_session(request) -> Optional[Company]:
@@ -70,145 +148,8 @@ def get_active_company_from_session(request) -> Optional[Company]:
     )
 
 
-def can_access_incident(user: User, incident: Incident, company_id=-1) -> bool:
-    # RegulatorUser can access only incidents from accessible sectors.
-    if (
-        user_in_group(user, "RegulatorUser")
-        and Incident.objects.filter(
-            pk=incident.id, sector_regulation__regulator=user.regulators.first()
-        ).exists()
-    ):
-        sectors = [
-            sector
-            for sector in incident.affected_sectors.all()
-            if sector in user.get_sectors().all()
-        ]
-        if len(sectors) > 0:
-            return True
-        else:
-            return False
-    # RegulatorAdmin can access only incidents from accessible regulators.
-    if (
-        user_in_group(user, "RegulatorAdmin")
-        and Incident.objects.filter(
-            pk=incident.id, sector_regulation__regulator=user.regulators.first()
-        ).exists()
-    ):
-        return True
-    # OperatorAdmin can access only incidents related to selected company.
-    if (
-        user_in_group(user, "OperatorAdmin")
-        and Incident.objects.filter(pk=incident.id, company__id=company_id).exists()
-    ):
-        return True
-    # OperatorUser can access incidents related to selected company and sectors
-    if (
-        user_in_group(user, "OperatorUser")
-        and Incident.objects.filter(
-            pk=incident.id,
-            company__id=company_id,
-            affected_sectors__in=user.sectors.all(),
-        ).exists()
-    ):
-        return True
-    # OperatorStaff and IncidentUser can access their reports.
-    if (
-        not is_user_regulator(user)
-        and (user_in_group(user, "OperatorUser") or user_in_group(user, "IncidentUser"))
-        and Incident.objects.filter(pk=incident.id, contact_user=user).exists()
-    ):
-        return True
-    # ObserverUser access all incident if he is in a observer who can access all incident.
-    if is_observer_user_viewving_all_incident(user):
-        return True
-
-    return False
-
-
-# check if the user is allowed to create an incident_workflow
-def can_create_incident_report(user: User, incident: Incident, company_id=-1) -> bool:
-    # prevent regulator and observer to create incident_workflow
-    if (
-        user_in_group(user, "RegulatorUser")
-        or user_in_group(user, "RegulatorAdmin")
-        or user_in_group(user, "ObserverAdmin")
-        or user_in_group(user, "ObserverUser")
-        or user_in_group(user, "PlatformAdmin")
-    ):
-        return False
-    # if it's the incident of the user he can create
-    if incident.contact_user == user:
-        return True
-    # if it's in his sector and user of the company
-    if (
-        user_in_group(user, "OperatorUser")
-        and Incident.objects.filter(
-            pk=incident.id,
-            company__id=company_id,
-            affected_sectors__in=user.sectors.all(),
-        ).exists()
-    ):
-        return True
-    # if he is admin of the company he can create
-    if (
-        user_in_group(user, "OperatorAdmin")
-        and Incident.objects.filter(pk=incident.id, company__id=company_id).exists()
-    ):
-        return True
-    return False
-
-
-# check if the user is allowed to edit an incident_workflow
-# for regulators to add message
-def can_edit_incident_report(user: User, incident: Incident, company_id=-1) -> bool:
-    # prevent platform admin
-    if user_in_group(user, "PlatformAdmin"):
-        return False
-    # if it's the incident of the user he can create
-    if incident.contact_user == user:
-        return True
-    # if it's in his sector and user of the company
-    if (
-        user_in_group(user, "OperatorUser")
-        and Incident.objects.filter(
-            pk=incident.id,
-            company__id=company_id,
-            affected_sectors__in=user.sectors.all(),
-        ).exists()
-    ):
-        return True
-    # if he is admin of the company he can create
-    if (
-        user_in_group(user, "OperatorAdmin")
-        and Incident.objects.filter(pk=incident.id, company__id=company_id).exists()
-    ):
-        return True
-    # if he is the regulator admin of the incident need to be link to his regulator
-    if (
-        user_in_group(user, "RegulatorAdmin")
-        and incident.sector_regulation.regulator == user.regulators.first()
-    ):
-        return True
-    # if he is the regulator user of the incident, he need to have the sectors
-    if (
-        user_in_group(user, "RegulatorUser")
-        and incident.sector_regulation.regulator == user.regulators.first()
-    ):
-        sectors = [
-            sector
-            for sector in incident.affected_sectors.all()
-            if sector in user.get_sectors().all()
-        ]
-        if len(sectors) > 0:
-            return True
-        else:
-            return False
-
-    return False
-
-
 def set_creator(request: HttpRequest, obj: Any, change: bool) -> Any:
-    regulator = request.user.regulators.first()
+    regulator = get_user_roles(request.user).regulator
     if not change:
         obj.creator_name = regulator
         obj.creator_id = regulator.id
@@ -250,7 +191,7 @@ def can_change_or_delete_obj(request: HttpRequest, obj: Any) -> bool:
     if isinstance(obj, Workflow):
         in_use = False
 
-    regulator = request.user.regulators.first()
+    regulator = get_user_roles(request.user).regulator
     if obj.creator == regulator and not in_use:
         return True
 
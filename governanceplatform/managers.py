@@ -1,5 +1,6 @@
 from django.contrib.auth.base_user import BaseUserManager
 from django.utils.translation import gettext as _
+from parler.managers import TranslatableManager, TranslatableQuerySet
 
 from .permissions import set_platform_admin_permissions
 
@@ -33,3 +34,24 @@ class CustomUserManager(BaseUserManager):
         set_platform_admin_permissions(user)
 
         return user
+
+
+class TranslationPrefetchQuerySet(TranslatableQuerySet):
+    def prefetch_translations(self, *related_names):
+        """
+        Prefetch the translations of the objects, and of the related translatable
+        objects given by name (e.g. "parent"), in one query per model.
+
+        parler reads the translations from the prefetched rows, so __str__ and
+        safe_translation_getter do not query for each object.
+        """
+        return self.prefetch_related(
+            "translations",
+            *[f"{related_name}__translations" for related_name in related_names],
+        )
+
+
+class TranslationPrefetchManager(
+    TranslatableManager.from_queryset(TranslationPrefetchQuerySet)
+):
+    """Manager of the translatable models with prefetch_translations()."""
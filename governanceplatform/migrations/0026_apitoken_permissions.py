@@ -0,0 +1,42 @@
+# Generated by Django 5.1.1 on 2026-10-17 09:12
+
+from django.db import migrations
+
+API_TOKEN_PERMISSIONS = ["add", "change", "delete", "view"]
+
+
+def add_api_token_permissions(apps, schema_editor):
+    Group = apps.get_model("auth", "Group")
+    Permission = apps.get_model("auth", "Permission")
+    ContentType = apps.get_model("contenttypes", "ContentType")
+
+    # the permissions of a new model are only created after the migrations
+    content_type, created = ContentType.objects.get_or_create(
+        app_label="governanceplatform", model="apitoken"
+    )
+    permissions = [
+        Permission.objects.get_or_create(
+            codename=f"{perm}_apitoken",
+            content_type=content_type,
+            defaults={"name": f"Can {perm} API token"},
+        )[0]
+        for perm in API_TOKEN_PERMISSIONS
+    ]
+
+    try:
+        group = Group.objects.get(name="PlatformAdmin")
+    except Group.DoesNotExist:
+        return
+    group.permissions.add(*permissions)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("governanceplatform", "0025_apitoken"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("contenttypes", "0002_remove_content_type_name"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_api_token_permissions, migrations.RunPython.noop),
+    ]
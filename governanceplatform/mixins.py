@@ -1,3 +1,6 @@
+from parler.models import TranslatableModelMixin
+
+
 class TranslationUpdateMixin:
     def after_save_instance(self, instance, using_transactions, dry_run):
         fields = instance._parler_meta.get_all_fields()
@@ -10,3 +13,28 @@ class TranslationUpdateMixin:
             language_code=instance.language_code,
             defaults=defaults,
         )
+
+
+class TranslationPrefetchAdminMixin:
+    """
+    Prefetch the translations of the listed objects and of the choices of their
+    translatable relations, so the names are not queried for each object.
+    """
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related("translations")
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        return prefetch_choices_translations(formfield)
+
+    def formfield_for_manytomany(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_manytomany(db_field, request, **kwargs)
+        return prefetch_choices_translations(formfield)
+
+
+def prefetch_choices_translations(formfield):
+    queryset = getattr(formfield, "queryset", None)
+    if queryset is not None and issubclass(queryset.model, TranslatableModelMixin):
+        formfield.queryset = queryset.prefetch_related("translations")
+    return formfield
@@ -1,6 +1,13 @@
+import hashlib
+import hmac
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.models import AbstractUser, PermissionsMixin
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django_countries.fields import CountryField
 from parler.models import TranslatableModel, TranslatedFields
@@ -8,7 +15,8 @@ from phonenumber_field.modelfields import PhoneNumberField
 
 import governanceplatform
 
-from .managers import CustomUserManager
+from .globals import API_TOKEN_SCOPES
+from .managers import CustomUserManager, TranslationPrefetchManager
 
 
 # sector
@@ -41,11 +49,19 @@ class Sector(TranslatableModel):
         default=None,
     )
 
+    objects = TranslationPrefetchManager()
+
     def get_safe_translation(self):
         name_translation = self.safe_translation_getter("name", any_language=True)
         return name_translation or ""
 
     def __str__(self):
+        # saved sectors are named from the sector tree, without query
+        sector_tree = governanceplatform.sector_tree.get_sector_tree()
+        if governanceplatform.sector_tree.get_sector(self.pk, sector_tree) is not None:
+            return governanceplatform.sector_tree.get_sector_full_name(
+                self.pk, sector_tree=sector_tree
+            )
         name = self.safe_translation_getter("name", any_language=True)
         if name and self.parent:
             parent_name = self.parent.safe_translation_getter("name", any_language=True)
@@ -151,11 +167,13 @@ class Company(models.Model):
     @admin.display(description="sectors")
     def get_sectors(self):
         sectors = []
-        for sector in self.sector_contacts.all().distinct():
-            if sector.name is not None and sector.parent is not None:
-                sectors.append(sector.parent.name + " --> " + sector.name)
-            elif sector.name is not None and sector.parent is None:
-                sectors.append(sector.name)
+        sector_tree = governanceplatform.sector_tree.get_sector_tree()
+        for sector_id in self.sector_contacts.values_list("id", flat=True).distinct():
+            sector_name = governanceplatform.sector_tree.get_sector_full_name(
+                sector_id, " --> ", sector_tree
+            )
+            if sector_name:
+                sectors.append(sector_name)
 
         return sectors
 
@@ -189,6 +207,8 @@ class Regulator(TranslatableModel):
         null=True,
     )
 
+    objects = TranslationPrefetchManager()
+
     def __str__(self):
         name_translation = self.safe_translation_getter("name", any_language=True)
         return name_translation or ""
@@ -440,6 +460,8 @@ class Regulation(TranslatableModel):
         verbose_name=_("Competent authorities"),
     )
 
+    objects = TranslationPrefetchManager()
+
     @admin.display(description="regulators")
     def get_regulators(self):
         return [
@@ -450,3 +472,57 @@ class Regulation(TranslatableModel):
     def __str__(self):
         label_translation = self.safe_translation_getter("label", any_language=True)
         return label_translation or ""
+
+
+def get_api_token_expiration():
+    return timezone.now() + timedelta(days=90)
+
+
+# token of the machine-to-machine calls of the API, only a keyed digest of the key
+# is stored, it is checked much faster than a password (see api/authentication.py)
+class ApiToken(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="api_tokens",
+        verbose_name=_("User"),
+    )
+    name = models.CharField(max_length=100, verbose_name=_("Name"))
+    # the beginning of the key, to recognize the token
+    prefix = models.CharField(max_length=8, editable=False, verbose_name=_("Prefix"))
+    digest = models.CharField(max_length=64, unique=True, editable=False)
+    scope = models.CharField(
+        max_length=5,
+        choices=API_TOKEN_SCOPES,
+        default=API_TOKEN_SCOPES[0][0],
+        verbose_name=_("Scope"),
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name=_("Creation date")
+    )
+    expires_at = models.DateTimeField(
+        default=get_api_token_expiration, verbose_name=_("Expiration date")
+    )
+
+    class Meta:
+        verbose_name = _("API token")
+        verbose_name_plural = _("API tokens")
+
+    def __str__(self):
+        return self.name
+
+    @staticmethod
+    def get_digest(key):
+        return hmac.new(
+            settings.SECRET_KEY.encode(), key.encode(), hashlib.sha256
+        ).hexdigest()
+
+    # generate a new key, returned once as only its digest is saved
+    def set_key(self):
+        key = secrets.token_urlsafe(32)
+        self.prefix = key[:8]
+        self.digest = self.get_digest(key)
+        return key
+
+    def is_expired(self):
+        return self.expires_at <= timezone.now()
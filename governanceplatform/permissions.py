@@ -55,6 +55,7 @@ def set_platform_admin_permissions(user):
             "regulation": ["add", "change", "delete"],
             "observeruser": ["add", "change", "delete"],
             "observer": ["add", "change", "delete"],
+            "apitoken": ["add", "change", "delete", "view"],
         },
     )
 
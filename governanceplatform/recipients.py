@@ -0,0 +1,93 @@
+from django.core.cache import cache
+
+from .caching import get_cache_key, get_cache_version, invalidate_cache
+from .models import Observer, Regulator, RegulatorUser
+
+RECIPIENTS_CACHE = "notification_recipients"
+RECIPIENTS_CACHE_TIMEOUT = 60 * 10
+
+
+def get_recipients_cache_key(version, regulator_id, sector_ids):
+    sectors = "-".join(str(sector_id) for sector_id in sorted(sector_ids))
+    return get_cache_key(RECIPIENTS_CACHE, regulator_id, sectors, version=version)
+
+
+def invalidate_recipients_cache():
+    """Invalidate all the cached recipients, called by the signals."""
+    invalidate_cache(RECIPIENTS_CACHE)
+
+
+def get_regulators_recipients(keys):
+    """
+    Return the recipients of several (regulator id, sector ids) by
+    (regulator id, frozenset of sector ids).
+
+    The recipients are the notification email of the regulator, the regulator users
+    responsible for one of the sectors and the observers receiving all incidents.
+    The recipients missing from the cache are resolved in a fixed number of queries,
+    whatever the number of keys.
+    """
+    keys = {(regulator_id, frozenset(sector_ids)) for regulator_id, sector_ids in keys}
+    if not keys:
+        return {}
+
+    version = get_cache_version(RECIPIENTS_CACHE)
+
+    cache_keys = {
+        key: get_recipients_cache_key(version, key[0], key[1]) for key in keys
+    }
+    cached = cache.get_many(cache_keys.values())
+    recipients = {
+        key: cached[cache_key]
+        for key, cache_key in cache_keys.items()
+        if cache_key in cached
+    }
+
+    missing_keys = keys - recipients.keys()
+    if missing_keys:
+        resolved = resolve_regulators_recipients(missing_keys)
+        cache.set_many(
+            {cache_keys[key]: resolved[key] for key in missing_keys},
+            RECIPIENTS_CACHE_TIMEOUT,
+        )
+        recipients.update(resolved)
+
+    return recipients
+
+
+def resolve_regulators_recipients(keys):
+    regulator_ids = {regulator_id for regulator_id, _sector_ids in keys}
+    sector_ids = set().union(*(sector_ids for _regulator_id, sector_ids in keys))
+
+    regulator_emails = dict(
+        Regulator.objects.filter(pk__in=regulator_ids).values_list(
+            "pk", "email_for_notification"
+        )
+    )
+    regulator_users_sectors = list(
+        RegulatorUser.objects.filter(
+            regulator_id__in=regulator_ids, sectors__in=sector_ids
+        ).values_list("regulator_id", "sectors", "user__email")
+    )
+    observer_emails = list(
+        Observer.objects.filter(is_receiving_all_incident=True).values_list(
+            "email_for_notification", flat=True
+        )
+    )
+
+    recipients = {}
+    for regulator_id, sector_ids in keys:
+        recipient_list = [regulator_emails.get(regulator_id)]
+        for user_regulator_id, sector_id, email in regulator_users_sectors:
+            if (
+                user_regulator_id == regulator_id
+                and sector_id in sector_ids
+                and email not in recipient_list
+            ):
+                recipient_list.append(email)
+        recipient_list.extend(observer_emails)
+        recipients[(regulator_id, sector_ids)] = [
+            email for email in recipient_list if email
+        ]
+
+    return recipients
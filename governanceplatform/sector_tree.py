@@ -0,0 +1,114 @@
+from collections import namedtuple
+
+from django.utils import translation
+
+from .caching import get_cache_version, invalidate_cache
+from .models import Sector
+
+SECTOR_TREE_CACHE = "sector_tree"
+
+# a sector of the tree, name is translated in the language of the tree
+SectorNode = namedtuple("SectorNode", ["id", "parent_id", "acronym", "name"])
+
+# sector trees of the current version by language, loaded once by process
+sector_trees = {}
+# keys of the sector trees loaded again because a sector was missing
+reloaded_sector_trees = set()
+
+
+def invalidate_sector_tree():
+    """Invalidate the sector tree of all the processes, called by the signals."""
+    invalidate_cache(SECTOR_TREE_CACHE)
+
+
+def get_sector_tree(language=None):
+    """
+    Return the SectorNode of all the sectors by id, in the current language.
+
+    The tree is loaded in two queries and kept in the process until a sector is
+    saved or deleted. The functions below take the tree as argument, so a caller
+    looking up several sectors gets it once.
+    """
+    if language is None:
+        language = translation.get_language()
+
+    version = get_cache_version(SECTOR_TREE_CACHE)
+
+    sector_tree = sector_trees.get((version, language))
+    if sector_tree is None:
+        sector_tree = load_sector_tree(language)
+        # the trees of the previous versions are outdated
+        for key in [key for key in sector_trees if key[0] != version]:
+            del sector_trees[key]
+            reloaded_sector_trees.discard(key)
+        sector_trees[(version, language)] = sector_tree
+
+    return sector_tree
+
+
+def reload_sector_tree(language=None):
+    """
+    Load the sector tree of the process again, once by version of the tree.
+
+    A sector created by another process may be missing until the version is read
+    again, the shared version is not changed.
+    """
+    if language is None:
+        language = translation.get_language()
+
+    key = (get_cache_version(SECTOR_TREE_CACHE), language)
+    if key in reloaded_sector_trees:
+        return get_sector_tree(language)
+    sector_tree = sector_trees[key] = load_sector_tree(language)
+    reloaded_sector_trees.add(key)
+    return sector_tree
+
+
+def load_sector_tree(language):
+    sector_tree = {}
+    for sector in Sector.objects.prefetch_related("translations"):
+        sector.set_current_language(language)
+        sector_tree[sector.id] = SectorNode(
+            sector.id,
+            sector.parent_id,
+            sector.acronym,
+            sector.get_safe_translation(),
+        )
+    return sector_tree
+
+
+def get_sector(sector_id, sector_tree=None):
+    """Return the SectorNode of the sector, or None."""
+    if sector_tree is None:
+        sector_tree = get_sector_tree()
+    sector = sector_tree.get(sector_id)
+    if sector is None and sector_id is not None:
+        # the sector may have been created since the tree was loaded
+        sector = reload_sector_tree().get(sector_id)
+    return sector
+
+
+def get_sector_parent(sector_id, sector_tree=None):
+    """Return the SectorNode of the parent of the sector, or None."""
+    if sector_tree is None:
+        sector_tree = get_sector_tree()
+    sector = get_sector(sector_id, sector_tree)
+    if sector is None or sector.parent_id is None:
+        return None
+    return get_sector(sector.parent_id, sector_tree)
+
+
+def get_sector_name(sector_id, sector_tree=None):
+    sector = get_sector(sector_id, sector_tree)
+    return sector.name if sector is not None else ""
+
+
+def get_sector_full_name(sector_id, separator=" → ", sector_tree=None):
+    """Return the name of the sector preceded by the name of its parent."""
+    if sector_tree is None:
+        sector_tree = get_sector_tree()
+    name = get_sector_name(sector_id, sector_tree)
+    parent = get_sector_parent(sector_id, sector_tree)
+    if name and parent is not None:
+        return parent.name + separator + name
+    return name
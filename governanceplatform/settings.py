@@ -72,6 +72,17 @@ except AttributeError:
     CORS_ALLOWED_ORIGIN_REGEXES = []
     CORS_ALLOW_METHODS = []
 
+try:
+    CACHES = config.CACHES
+except AttributeError:
+    # a local memory cache is not shared by the processes
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.path.join(BASE_DIR, "cache"),
+        },
+    }
+
 try:
     if LOG_DIRECTORY:
         # if not logging in stdout
@@ -120,6 +131,7 @@ REST_FRAMEWORK = {
     # Use Django's standard `django.contrib.auth` permissions,
     # or allow read-only access for unauthenticated users.
     "DEFAULT_AUTHENTICATION_CLASSES": [
+        "api.authentication.ApiTokenAuthentication",
         "rest_framework.authentication.BasicAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ],
@@ -273,9 +285,19 @@ STATICFILES_DIRS = [
     STATIC_THEME_DIR,
 ]
 
+# PDF reports already rendered, see incidents/pdf_generation.py
+PDF_CACHE_DIR = os.path.join(BASE_DIR, "pdf_cache")
+# the ZIP archives of the PDF reports of more incidents are prepared by the
+# build_pdf_archives script instead of being streamed
+PDF_ZIP_STREAM_MAX_INCIDENTS = 20
+# number of processes rendering the PDF reports of an archive
+PDF_RENDER_PROCESSES = 4
+
 # Used to get an access to the header on JS side.
 CORS_EXPOSE_HEADERS = [
     "content-disposition",
+    "link",
+    "x-cursor",
 ]
 
 # Default settings
@@ -1,13 +1,22 @@
 from django.contrib.auth.models import Group
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models.signals import post_delete, post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.admin.models import LogEntry
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth.signals import user_logged_in
 from governanceplatform.models import User
 
-from .models import ObserverUser, RegulatorUser, SectorCompanyContact
+from .models import (
+    ApiToken,
+    Observer,
+    ObserverUser,
+    Regulation,
+    Regulator,
+    RegulatorUser,
+    Sector,
+    SectorCompanyContact,
+)
 from .permissions import (
     set_observer_admin_permissions,
     set_observer_user_permissions,
@@ -17,7 +26,17 @@ from .permissions import (
     set_regulator_staff_permissions,
 )
 
-from .helpers import user_in_group
+from .caching import (
+    API_TOKEN_CACHE,
+    IMPACT_CHOICES_CACHE,
+    REGULATION_CHOICES_CACHE,
+    REGULATOR_CHOICES_CACHE,
+    SECTOR_CHOICES_CACHE,
+    invalidate_cache,
+)
+from .helpers import invalidate_user_roles, invalidate_users_roles, user_in_group
+from .recipients import invalidate_recipients_cache
+from .sector_tree import invalidate_sector_tree
 
 
 # Add logs for user connection
@@ -131,3 +150,84 @@ def delete_user_groups(sender, instance, **kwargs):
         user.is_superuser = False
 
     user.save()
+
+
+# the recipients of the incident notifications changed
+@receiver(post_save, sender=Regulator)
+@receiver(post_delete, sender=Regulator)
+@receiver(post_save, sender=RegulatorUser)
+@receiver(post_delete, sender=RegulatorUser)
+@receiver(post_save, sender=Observer)
+@receiver(post_delete, sender=Observer)
+def update_notification_recipients(sender, instance, **kwargs):
+    invalidate_recipients_cache()
+
+
+@receiver(post_save, sender=User)
+def update_notification_recipients_email(sender, instance, update_fields, **kwargs):
+    # the last login is saved at each connection
+    if update_fields is None or "email" in update_fields:
+        invalidate_recipients_cache()
+
+
+@receiver(m2m_changed, sender=RegulatorUser.sectors.through)
+def update_notification_recipients_sectors(sender, instance, action, **kwargs):
+    if action in ["post_add", "post_remove", "post_clear"]:
+        invalidate_recipients_cache()
+
+
+# the groups of the user changed, its roles are loaded again
+@receiver(m2m_changed, sender=User.groups.through)
+def update_user_roles(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ["post_add", "post_remove", "post_clear"]:
+        return
+    if not reverse:
+        invalidate_user_roles(instance)
+    elif action == "post_clear":
+        # the users of the group are not known anymore
+        invalidate_users_roles()
+    else:
+        invalidate_users_roles(pk_set)
+
+
+# the sectors changed, the sector tree is loaded again
+@receiver(post_save, sender=Sector)
+@receiver(post_delete, sender=Sector)
+@receiver(post_save, sender=Sector._parler_meta.root_model)
+@receiver(post_delete, sender=Sector._parler_meta.root_model)
+def update_sector_tree(sender, instance, **kwargs):
+    invalidate_sector_tree()
+    # the names of the sectors are in the choices of the forms
+    invalidate_cache(SECTOR_CHOICES_CACHE, IMPACT_CHOICES_CACHE)
+
+
+# the regulators changed, the choices of the notification form are built again
+@receiver(post_save, sender=Regulator)
+@receiver(post_delete, sender=Regulator)
+@receiver(post_save, sender=Regulator._parler_meta.root_model)
+@receiver(post_delete, sender=Regulator._parler_meta.root_model)
+def update_regulator_choices(sender, instance, **kwargs):
+    invalidate_cache(REGULATOR_CHOICES_CACHE)
+
+
+# the regulations changed, the choices of the notification form are built again
+@receiver(post_save, sender=Regulation)
+@receiver(post_delete, sender=Regulation)
+@receiver(post_save, sender=Regulation._parler_meta.root_model)
+@receiver(post_delete, sender=Regulation._parler_meta.root_model)
+def update_regulation_choices(sender, instance, **kwargs):
+    invalidate_cache(REGULATION_CHOICES_CACHE)
+
+
+# the tokens or their users changed, the tokens are checked again
+@receiver(post_save, sender=ApiToken)
+@receiver(post_delete, sender=ApiToken)
+def update_api_tokens(sender, instance, **kwargs):
+    invalidate_cache(API_TOKEN_CACHE)
+
+
+@receiver(post_save, sender=User)
+def update_api_tokens_user(sender, instance, update_fields, **kwargs):
+    # the last login is saved at each connection
+    if update_fields is None or set(update_fields) != {"last_login"}:
+        invalidate_cache(API_TOKEN_CACHE)
@@ -0,0 +1,163 @@
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+
+from governanceplatform.helpers import (
+    get_user_roles,
+    is_observer_user_viewving_all_incident,
+)
+from governanceplatform.models import RegulatorUser, SectorCompanyContact, User
+
+from .models import Incident
+
+# The access rules of the users to the incidents are Q objects, the same rule
+# filters the incidents list and checks the access to one or several incidents
+# in a single query.
+ALL_INCIDENTS = Q()
+NO_INCIDENTS = Q(pk__in=[])
+
+
+def combine_rules(rules):
+    # no rule gives access to no incident
+    if not rules:
+        return NO_INCIDENTS
+    return reduce(or_, rules)
+
+
+def get_regulator_rule(user):
+    return Q(
+        sector_regulation__regulator__in=RegulatorUser.objects.filter(user=user).values(
+            "regulator_id"
+        )
+    )
+
+
+def get_regulator_sectors_rule(user):
+    # the incidents of the sectors of the regulator user
+    return Q(
+        pk__in=Incident.affected_sectors.through.objects.filter(
+            sector_id__in=RegulatorUser.sectors.through.objects.filter(
+                regulatoruser__user=user
+            ).values("sector_id")
+        ).values("incident_id")
+    )
+
+
+def get_company_sectors_rule(user, company_id):
+    # the incidents of the company in the sectors of the operator user
+    return Q(
+        company__id=company_id,
+        pk__in=Incident.affected_sectors.through.objects.filter(
+            sector_id__in=SectorCompanyContact.objects.filter(user=user).values(
+                "sector_id"
+            )
+        ).values("incident_id"),
+    )
+
+
+def get_incident_access_rule(user: User, company_id=-1) -> Q:
+    """Return the filter of the incidents the user can access."""
+    roles = get_user_roles(user)
+    # ObserverUser access all incident if he is in a observer who can access all incident.
+    if is_observer_user_viewving_all_incident(user):
+        return ALL_INCIDENTS
+
+    rules = []
+    # RegulatorUser can access only incidents from accessible sectors.
+    if roles.in_group("RegulatorUser"):
+        rules.append(get_regulator_rule(user) & get_regulator_sectors_rule(user))
+    # RegulatorAdmin can access only incidents from accessible regulators.
+    if roles.in_group("RegulatorAdmin"):
+        rules.append(get_regulator_rule(user))
+    # OperatorAdmin can access only incidents related to selected company.
+    if roles.in_group("OperatorAdmin"):
+        rules.append(Q(company__id=company_id))
+    # OperatorUser can access incidents related to selected company and sectors
+    if roles.in_group("OperatorUser"):
+        rules.append(get_company_sectors_rule(user, company_id))
+    # OperatorStaff and IncidentUser can access their reports.
+    if not roles.in_group("RegulatorAdmin", "RegulatorUser") and roles.in_group(
+        "OperatorUser", "IncidentUser"
+    ):
+        rules.append(Q(contact_user=user))
+
+    return combine_rules(rules)
+
+
+def get_incident_report_creation_rule(user: User, company_id=-1) -> Q:
+    """Return the filter of the incidents the user can create a report for."""
+    roles = get_user_roles(user)
+    # prevent regulator and observer to create incident_workflow
+    if roles.in_group(
+        "RegulatorUser",
+        "RegulatorAdmin",
+        "ObserverAdmin",
+        "ObserverUser",
+        "PlatformAdmin",
+    ):
+        return NO_INCIDENTS
+
+    # if it's the incident of the user he can create
+    rules = [Q(contact_user=user)]
+    # if it's in his sector and user of the company
+    if roles.in_group("OperatorUser"):
+        rules.append(get_company_sectors_rule(user, company_id))
+    # if he is admin of the company he can create
+    if roles.in_group("OperatorAdmin"):
+        rules.append(Q(company__id=company_id))
+
+    return combine_rules(rules)
+
+
+def get_incident_report_edition_rule(user: User, company_id=-1) -> Q:
+    """Return the filter of the incidents the user can edit the reports of."""
+    roles = get_user_roles(user)
+    # prevent platform admin
+    if roles.in_group("PlatformAdmin"):
+        return NO_INCIDENTS
+
+    # if it's the incident of the user he can edit
+    rules = [Q(contact_user=user)]
+    # if it's in his sector and user of the company
+    if roles.in_group("OperatorUser"):
+        rules.append(get_company_sectors_rule(user, company_id))
+    # if he is admin of the company he can edit
+    if roles.in_group("OperatorAdmin"):
+        rules.append(Q(company__id=company_id))
+    # if he is the regulator admin of the incident need to be link to his regulator
+    if roles.in_group("RegulatorAdmin"):
+        rules.append(get_regulator_rule(user))
+    # if he is the regulator user of the incident, he need to have the sectors
+    if roles.in_group("RegulatorUser"):
+        rules.append(get_regulator_rule(user) & get_regulator_sectors_rule(user))
+
+    return combine_rules(rules)
+
+
+def is_incident_allowed(rule: Q, incident: Incident) -> bool:
+    """Check if the incident matches the rule, in one query at most."""
+    if rule == ALL_INCIDENTS:
+        return True
+    if rule == NO_INCIDENTS:
+        return False
+    return Incident.objects.filter(rule, pk=incident.id).exists()
+
+
+def can_access_incident(user: User, incident: Incident, company_id=-1) -> bool:
+    return is_incident_allowed(get_incident_access_rule(user, company_id), incident)
+
+
+# check if the user is allowed to create an incident_workflow
+def can_create_incident_report(user: User, incident: Incident, company_id=-1) -> bool:
+    return is_incident_allowed(
+        get_incident_report_creation_rule(user, company_id), incident
+    )
+
+
+# check if the user is allowed to edit an incident_workflow
+# for regulators to add message
+def can_edit_incident_report(user: User, incident: Incident, company_id=-1) -> bool:
+    return is_incident_allowed(
+        get_incident_report_edition_rule(user, company_id), incident
+    )
@@ -25,6 +25,11 @@ from governanceplatform.helpers import (
 )
 from governanceplatform.mixins import TranslationUpdateMixin
 from governanceplatform.models import Regulation, Regulator, Sector, User
+from governanceplatform.sector_tree import (
+    get_sector_name,
+    get_sector_parent,
+    get_sector_tree,
+)
 from governanceplatform.widgets import TranslatedNameM2MWidget, TranslatedNameWidget
 from incidents.models import (
     Email,
@@ -523,11 +528,13 @@ class ImpactAdmin(ExportActionModelAdmin, CustomTranslatableAdmin):
     @admin.display(description="Sector")
     def get_sector_name(self, obj):
         sectors = []
+        sector_tree = get_sector_tree()
         for sector in obj.sectors.all():
+            parent = get_sector_parent(sector.id, sector_tree)
             sector_name = (
-                sector.parent.get_safe_translation()
-                if sector.parent
-                else sector.get_safe_translation()
+                parent.name
+                if parent is not None
+                else get_sector_name(sector.id, sector_tree)
             )
             sectors.append(sector_name)
 
@@ -536,8 +543,13 @@ class ImpactAdmin(ExportActionModelAdmin, CustomTranslatableAdmin):
     @admin.display(description="Sub-sector")
     def get_subsector_name(self, obj):
         sectors = []
+        sector_tree = get_sector_tree()
         for sector in obj.sectors.all():
-            sector_name = sector.get_safe_translation() if sector.parent else ""
+            sector_name = (
+                get_sector_name(sector.id, sector_tree)
+                if get_sector_parent(sector.id, sector_tree)
+                else ""
+            )
             sectors.append(sector_name)
         return sectors
 
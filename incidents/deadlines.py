@@ -0,0 +1,190 @@
+from collections import namedtuple
+from datetime import timedelta
+from functools import partial
+
+from django.db import transaction
+from django.utils import timezone
+
+from .email import send_email
+from .models import Incident, IncidentDeadline
+
+# deadline of a report for an incident, deadline is None when no deadline applies
+ReportDeadline = namedtuple("ReportDeadline", ["deadline", "is_exceeded"])
+
+
+def get_report_deadline(incident, sector_regulation_workflow, previous_submission):
+    """
+    Return the due time of a report of the incident, or None.
+
+    previous_submission is the latest submission (IncidentWorkflow) of the
+    previous report of the sector regulation, if any.
+    """
+    trigger_event = sector_regulation_workflow.trigger_event_before_deadline
+
+    if trigger_event == "DETECT_DATE":
+        start_date = incident.incident_detection_date
+    elif trigger_event == "NOTIF_DATE":
+        start_date = incident.incident_notification_date
+    elif trigger_event == "PREV_WORK" and previous_submission is not None:
+        start_date = previous_submission.timestamp
+    else:
+        start_date = None
+
+    if start_date is None:
+        return None
+
+    return start_date + timedelta(
+        hours=sector_regulation_workflow.delay_in_hours_before_deadline
+    )
+
+
+def get_incident_deadlines(incident, now=None):
+    """Return the ReportDeadline of each report of the incident by workflow id."""
+    if now is None:
+        now = timezone.now()
+
+    latest_submissions = {
+        incident_workflow.workflow_id: incident_workflow
+        for incident_workflow in incident.get_latest_incident_workflows()
+    }
+
+    report_deadlines = {}
+    previous_submission = None
+    for sector_regulation_workflow in incident.get_sector_regulation_workflows():
+        deadline = get_report_deadline(
+            incident, sector_regulation_workflow, previous_submission
+        )
+        report_deadlines[sector_regulation_workflow.workflow_id] = ReportDeadline(
+            deadline, deadline is not None and now >= deadline
+        )
+        previous_submission = latest_submissions.get(
+            sector_regulation_workflow.workflow_id
+        )
+
+    return report_deadlines
+
+
+def compute_incidents_deadlines(incidents, now=None):
+    """
+    Set the report_deadlines attribute on each incident.
+
+    The reports and incident workflows of the incidents should be prefetched
+    (see incident_list.py), otherwise they are queried for each incident.
+    """
+    if now is None:
+        now = timezone.now()
+
+    for incident in incidents:
+        incident.report_deadlines = get_incident_deadlines(incident, now)
+
+    return incidents
+
+
+def update_incident_deadlines(incident, now=None):
+    """
+    Synchronize the deadlines queue with the reports of the incident.
+
+    Called when a report is submitted, when the incident status changes and when the
+    detection date is edited. Only the reports not yet submitted of an open incident
+    are kept in the queue.
+    """
+    if incident.incident_status == "CLOSE" or incident.sector_regulation is None:
+        IncidentDeadline.objects.filter(incident=incident).delete()
+        return
+
+    submitted_workflows = {
+        incident_workflow.workflow_id
+        for incident_workflow in incident.get_latest_incident_workflows()
+    }
+    existing_deadlines = {
+        incident_deadline.workflow_id: incident_deadline
+        for incident_deadline in IncidentDeadline.objects.filter(incident=incident)
+    }
+
+    for workflow_id, report_deadline in get_incident_deadlines(incident, now).items():
+        if workflow_id in submitted_workflows or report_deadline.deadline is None:
+            continue
+        incident_deadline = existing_deadlines.pop(workflow_id, None)
+        if incident_deadline is None:
+            IncidentDeadline.objects.create(
+                incident=incident,
+                workflow_id=workflow_id,
+                deadline=report_deadline.deadline,
+            )
+        elif incident_deadline.deadline != report_deadline.deadline:
+            # the deadline moved, it has to be processed again
+            incident_deadline.deadline = report_deadline.deadline
+            incident_deadline.processed_at = None
+            incident_deadline.save(update_fields=["deadline", "processed_at"])
+
+    # submitted reports and reports without deadline anymore
+    if existing_deadlines:
+        IncidentDeadline.objects.filter(
+            pk__in=[
+                incident_deadline.pk
+                for incident_deadline in existing_deadlines.values()
+            ]
+        ).delete()
+
+
+def create_incidents_deadlines(incidents, now=None):
+    """
+    Queue the deadlines of new incidents in one query.
+
+    The incidents should have no submitted report yet and the reports of their
+    sector regulation should be prefetched, as done when the incidents are created.
+    """
+    IncidentDeadline.objects.bulk_create(
+        [
+            IncidentDeadline(
+                incident=incident,
+                workflow_id=workflow_id,
+                deadline=report_deadline.deadline,
+            )
+            for incident in incidents
+            for workflow_id, report_deadline in get_incident_deadlines(
+                incident, now
+            ).items()
+            if report_deadline.deadline is not None
+        ]
+    )
+
+
+def process_due_deadlines(now=None):
+    """
+    Mark the incidents with a report not submitted in time as out of time.
+
+    Only the deadlines due and not yet processed are fetched, each one is processed
+    once even if several runs overlap. Return the number of processed deadlines.
+    """
+    if now is None:
+        now = timezone.now()
+
+    due_deadlines = IncidentDeadline.objects.filter(
+        deadline__lte=now,
+        processed_at__isnull=True,
+        incident__incident_status="GOING",
+    ).select_related("incident__sector_regulation__report_status_changed_email")
+
+    processed = 0
+    for incident_deadline in due_deadlines:
+        with transaction.atomic():
+            # claim the deadline, another run may have processed it meanwhile
+            claimed = IncidentDeadline.objects.filter(
+                pk=incident_deadline.pk, processed_at__isnull=True
+            ).update(processed_at=now)
+            if not claimed:
+                continue
+
+            incident = incident_deadline.incident
+            Incident.objects.filter(pk=incident.pk).update(
+                review_status="OUT", updated_at=timezone.now()
+            )
+            incident.review_status = "OUT"
+            processed += 1
+
+            email = incident.sector_regulation.report_status_changed_email
+            if email is not None:
+                transaction.on_commit(partial(send_email, email, incident))
+
+    return processed
@@ -1,20 +1,59 @@
-from datetime import date
+import logging
+import re
+from datetime import date, timedelta
 
-from django.core.mail import EmailMessage
-from django.template.loader import render_to_string
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.template.loader import get_template
 from django.urls import reverse
+from django.utils import timezone
 
 from governanceplatform.config import EMAIL_SENDER, PUBLIC_URL
-from governanceplatform.models import RegulatorUser, Observer
+from governanceplatform.recipients import get_regulators_recipients
 from incidents.globals import INCIDENT_EMAIL_VARIABLES
+from incidents.models import Incident, QueuedEmail
 
+logger = logging.getLogger(__name__)
 
-# replace the variables in globals.py by the right value
-def replace_email_variables(content, incident):
-    # find the incidents which don't have final notification.
-    modify_content = content
-    modify_content = modify_content.replace("#PUBLIC_URL#", PUBLIC_URL)
-    for _i, (variable, key) in enumerate(INCIDENT_EMAIL_VARIABLES):
+# number of emails sent at once over the same SMTP connection
+QUEUED_EMAILS_BATCH_SIZE = 50
+# an email is given up after this number of failed attempts
+QUEUED_EMAILS_MAX_ATTEMPTS = 6
+# delay before the first retry, doubled after each failed attempt
+QUEUED_EMAILS_RETRY_DELAY = timedelta(minutes=5)
+
+
+# variables of the email templates, a compiled template alternates text and variables
+EMAIL_VARIABLES_REGEX = re.compile(
+    "("
+    + "|".join(
+        re.escape(variable)
+        for variable in ["#PUBLIC_URL#"]
+        + [variable for variable, _key in INCIDENT_EMAIL_VARIABLES]
+    )
+    + ")"
+)
+# compiled subject and content of the email templates
+# by (email id, language, updated_at)
+COMPILED_EMAILS_CACHE_SIZE = 256
+compiled_emails = {}
+
+
+def compile_email_content(content):
+    return EMAIL_VARIABLES_REGEX.split(content)
+
+
+def render_email_content(compiled_content, variables):
+    return "".join(
+        variables[part] if index % 2 else part
+        for index, part in enumerate(compiled_content)
+    )
+
+
+# value of the variables in globals.py for the incident
+def get_email_variables(incident):
+    variables = {"#PUBLIC_URL#": PUBLIC_URL}
+    for variable, key in INCIDENT_EMAIL_VARIABLES:
         if variable == "#INCIDENT_FINAL_NOTIFICATION_URL#":
             incident_id = getattr(incident, key)
             final_notification_url = PUBLIC_URL + reverse(
@@ -28,53 +67,188 @@ def replace_email_variables(content, incident):
             )
             if isinstance(var_txt, date):
                 var_txt = getattr(incident, key).strftime("%Y-%m-%d")
-        modify_content = modify_content.replace(variable, var_txt)
-    return modify_content
+        variables[variable] = var_txt
+    return variables
 
 
+# replace the variables in globals.py by the right value
+def replace_email_variables(content, incident):
+    return render_email_content(
+        compile_email_content(content), get_email_variables(incident)
+    )
+
+
+# the subject and content of the email in the current language are compiled once
+def get_compiled_email(email):
+    key = (email.pk, email.get_current_language(), email.updated_at)
+    compiled_email = compiled_emails.get(key)
+    if compiled_email is None:
+        if len(compiled_emails) >= COMPILED_EMAILS_CACHE_SIZE:
+            compiled_emails.clear()
+        compiled_email = compiled_emails[key] = (
+            compile_email_content(email.subject),
+            compile_email_content(email.content),
+        )
+    return compiled_email
+
+
+def render_emails(email, incidents):
+    """Return the subject and the html content of the email for each incident."""
+    compiled_subject, compiled_content = get_compiled_email(email)
+    template = get_template("email.html")
+
+    rendered_emails = []
+    for incident in incidents:
+        variables = get_email_variables(incident)
+        html_content = template.render(
+            {
+                "content": render_email_content(compiled_content, variables),
+                "url_site": PUBLIC_URL,
+                "company_name": incident.company_name,
+                "incident_contact_title": incident.contact_title,
+                "incident_contact_firstname": incident.contact_firstname,
+                "incident_contact_lastname": incident.contact_lastname,
+                "technical_contact_title": incident.technical_title,
+                "technical_contact_firstname": incident.technical_firstname,
+                "technical_contact_lastname": incident.technical_lastname,
+            }
+        )
+        rendered_emails.append(
+            (render_email_content(compiled_subject, variables), html_content)
+        )
+
+    return rendered_emails
+
+
+# the email is queued and sent by the send_queued_emails script,
+# so the SMTP server is never reached during a request
 def send_html_email(subject, content, recipient_list):
-    email = EmailMessage(subject, content, EMAIL_SENDER, bcc=recipient_list)
+    QueuedEmail.objects.create(
+        subject=subject, content=content, recipients=list(recipient_list)
+    )
+
+
+def send_queued_emails(now=None):
+    """
+    Send the queued emails over one SMTP connection per batch.
+
+    The emails are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so several
+    workers can run at the same time. A failed email is retried later with an
+    exponential backoff, the error is recorded and the email is given up after
+    QUEUED_EMAILS_MAX_ATTEMPTS attempts. Return the number of sent emails.
+    """
+    if now is None:
+        now = timezone.now()
+
+    sent = 0
+    while True:
+        with transaction.atomic():
+            queued_emails = list(
+                QueuedEmail.objects.select_for_update(skip_locked=True)
+                .filter(
+                    send_after__lte=now, sent_at__isnull=True, failed_at__isnull=True
+                )
+                .order_by("send_after", "pk")[:QUEUED_EMAILS_BATCH_SIZE]
+            )
+            if not queued_emails:
+                return sent
+
+            connection = get_connection()
+            try:
+                for queued_email in queued_emails:
+                    if send_queued_email(queued_email, connection, now):
+                        sent += 1
+            finally:
+                connection.close()
+
+
+def send_queued_email(queued_email, connection, now):
+    email = EmailMessage(
+        queued_email.subject,
+        queued_email.content,
+        EMAIL_SENDER,
+        bcc=queued_email.recipients,
+        connection=connection,
+    )
     email.content_subtype = "html"
-    email.send(fail_silently=True)
+    queued_email.attempts += 1
+    try:
+        email.send()
+    except Exception as e:
+        logger.warning("Sending of email %s failed: %s", queued_email.pk, e)
+        # the connection may be broken, it is reopened for the next email
+        connection.close()
+        queued_email.last_error = str(e)
+        if queued_email.attempts >= QUEUED_EMAILS_MAX_ATTEMPTS:
+            queued_email.failed_at = now
+        else:
+            queued_email.send_after = now + QUEUED_EMAILS_RETRY_DELAY * 2 ** (
+                queued_email.attempts - 1
+            )
+        queued_email.save(
+            update_fields=["attempts", "last_error", "failed_at", "send_after"]
+        )
+        return False
 
+    queued_email.sent_at = now
+    queued_email.save(update_fields=["attempts", "sent_at"])
+    return True
 
-def send_email(email, incident):
-    subject = replace_email_variables(email.subject, incident)
-    html_content = render_to_string(
-        "email.html",
-        {
-            "content": replace_email_variables(email.content, incident),
-            "url_site": PUBLIC_URL,
-            "company_name": incident.company_name,
-            "incident_contact_title": incident.contact_title,
-            "incident_contact_firstname": incident.contact_firstname,
-            "incident_contact_lastname": incident.contact_lastname,
-            "technical_contact_title": incident.technical_title,
-            "technical_contact_firstname": incident.technical_firstname,
-            "technical_contact_lastname": incident.technical_lastname,
-        },
+
+def get_incidents_recipients(incidents):
+    """
+    Return the recipients of the notifications of each incident by incident id.
+
+    The incident contact, the regulator, the regulator users responsible for the
+    affected sectors and the observers receiving all incidents are notified.
+    The recipients are resolved in a fixed number of queries, whatever the number of
+    incidents. Only the contact is notified of an incident without regulation.
+    """
+    affected_sectors = {incident.pk: set() for incident in incidents}
+    for incident_id, sector_id in Incident.affected_sectors.through.objects.filter(
+        incident__in=incidents
+    ).values_list("incident_id", "sector_id"):
+        affected_sectors[incident_id].add(sector_id)
+    incidents_data = {
+        incident_id: (contact_email, regulator_id)
+        for incident_id, contact_email, regulator_id in Incident.objects.filter(
+            pk__in=affected_sectors.keys()
+        ).values_list("pk", "contact_user__email", "sector_regulation__regulator_id")
+    }
+
+    regulators_recipients = get_regulators_recipients(
+        (regulator_id, affected_sectors[incident_id])
+        for incident_id, (_contact_email, regulator_id) in incidents_data.items()
+        if regulator_id is not None
     )
-    recipient_list = [incident.contact_user.email]
-    # get also regulator email and emails of responsible people for the designated sectors
-    sector_regulation = incident.sector_regulation
-    regulator_email = sector_regulation.regulator.email_for_notification
-    recipient_list.append(regulator_email)
-
-    regulator_users_sectored = RegulatorUser.objects.filter(
-        regulator=sector_regulation.regulator,
-        sectors__in=incident.affected_sectors.all(),
-    ).distinct("user")
-    regulator_users_sectored_emails = []
-    for u in regulator_users_sectored:
-        regulator_users_sectored_emails.append(u.user.email)
-
-    recipient_list.extend(regulator_users_sectored_emails)
-
-    observer_emails = []
-    observers = Observer.objects.filter(is_receiving_all_incident=True)
-    for obs in observers:
-        observer_emails.append(obs.email_for_notification)
-
-    recipient_list.extend(observer_emails)
-
-    send_html_email(subject, html_content, recipient_list)
+
+    recipients = {}
+    for incident_id, (contact_email, regulator_id) in incidents_data.items():
+        recipient_list = [contact_email] if contact_email else []
+        if regulator_id is not None:
+            recipient_list.extend(
+                regulators_recipients[
+                    (regulator_id, frozenset(affected_sectors[incident_id]))
+                ]
+            )
+        recipients[incident_id] = recipient_list
+
+    return recipients
+
+
+# send the same email for several incidents,
+# the template is compiled and the recipients are resolved once
+def send_emails(email, incidents):
+    incidents = list(incidents)
+    recipients = get_incidents_recipients(incidents)
+    for incident, (subject, html_content) in zip(
+        incidents, render_emails(email, incidents)
+    ):
+        recipient_list = recipients.get(incident.pk, [])
+        # nobody to notify, nothing is queued
+        if recipient_list:
+            send_html_email(subject, html_content, recipient_list)
+
+
+def send_email(email, incident):
+    send_emails(email, [incident])
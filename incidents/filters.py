@@ -1,43 +1,39 @@
 import django_filters
 from django.db.models import Case, Value, When
-from django.db.models.functions import Concat
 from django.utils.translation import get_language
 
 from governanceplatform.models import Sector
+from governanceplatform.sector_tree import get_sector_full_name, get_sector_tree
 
-from .forms import (
-    DropdownCheckboxSelectMultiple,
-    IncidentStatusForm,
-    IncidentWorkflowForm,
-)
+from .forms import DropdownCheckboxSelectMultiple
 from .models import Incident, SectorRegulation
 
 
 # define a tree view for the sectors (only work with 2 levels)
 # Only fetch on the current language
 def affected_sectors(request):
-    return (
-        Sector.objects.translated(get_language())
-        .annotate(
-            full_name=Case(
-                When(
-                    parent__isnull=False,
-                    then=Concat(
-                        "parent__translations__name",
-                        Value(" --> "),
-                        "translations__name",
-                    ),
-                ),
-                default="translations__name",
-            )
+    sector_tree = get_sector_tree()
+    sector_ids = sorted(
+        sector_tree,
+        key=lambda sector_id: get_sector_full_name(sector_id, " --> ", sector_tree),
+    )
+    return Sector.objects.translated(get_language()).order_by(
+        Case(
+            *[
+                When(pk=sector_id, then=Value(position))
+                for position, sector_id in enumerate(sector_ids)
+            ]
         )
-        .order_by("full_name")
     )
 
 
 # define specific query to get the regulation
 def sector_regulation(request):
-    return SectorRegulation.objects.translated(get_language()).distinct()
+    return (
+        SectorRegulation.objects.translated(get_language())
+        .distinct()
+        .prefetch_translations()
+    )
 
 
 class IncidentFilter(django_filters.FilterSet):
@@ -56,21 +52,3 @@ class IncidentFilter(django_filters.FilterSet):
             "affected_sectors",
             "sector_regulation",
         ]
-
-    # Needed to add the form for modification of
-    # incident_id, incident_status and significative impact
-    @property
-    def qs(self):
-        parent = super().qs
-
-        for incident in parent:
-            incident.formsWorkflow = []
-            for workflow_completed in incident.get_workflows_completed():
-                incident.formsWorkflow.append(
-                    IncidentWorkflowForm(instance=workflow_completed)
-                )
-            incident.formsStatus = IncidentStatusForm(
-                instance=incident,
-            )
-
-        return parent
@@ -0,0 +1,80 @@
+from django.db.models import Prefetch
+
+from governanceplatform.caching import get_or_compute_translated, invalidate_cache
+
+from .models import PredefinedAnswerOptions, QuestionCategory
+
+WORKFLOW_SCHEMA_CACHE = "workflow_schema"
+
+
+def invalidate_workflow_schemas():
+    """Invalidate the schemas of all the workflows, called by the signals."""
+    invalidate_cache(WORKFLOW_SCHEMA_CACHE)
+
+
+def get_workflow_schema(workflow):
+    """
+    Return the questions of the workflow by category, in the current language.
+
+    The schema is a list of the categories in order, each a dict with the id, the
+    label and the questions of the category. A question is a dict with the question
+    options id, the question id, type, label, tooltip, is_mandatory and the choices
+    of the predefined answers. The schema is computed once by workflow and language.
+    """
+    return get_or_compute_translated(
+        WORKFLOW_SCHEMA_CACHE, [workflow.pk], lambda: compile_workflow_schema(workflow)
+    )
+
+
+def compile_workflow_schema(workflow):
+    category_ids = list(
+        workflow.questionoptions_set.values_list(
+            "category__questioncategoryoptions__question_category__id", flat=True
+        )
+        .distinct()
+        .order_by("category__questioncategoryoptions__position")
+    )
+    categories = QuestionCategory.objects.prefetch_translations().in_bulk(category_ids)
+    question_options = (
+        workflow.questionoptions_set.select_related("question")
+        .prefetch_related(
+            "question__translations",
+            Prefetch(
+                "predefinedansweroptions_set",
+                queryset=PredefinedAnswerOptions.objects.select_related(
+                    "predefined_answer"
+                )
+                .prefetch_related("predefined_answer__translations")
+                .order_by("position", "pk"),
+            ),
+        )
+        .order_by("position", "pk")
+    )
+
+    schema = []
+    for category_id in dict.fromkeys(category_ids):
+        category = categories.get(category_id)
+        schema.append(
+            {
+                "id": category_id,
+                "label": str(category) if category is not None else "",
+                "questions": [
+                    {
+                        "id": question_option.pk,
+                        "question_id": question_option.question_id,
+                        "question_type": question_option.question.question_type,
+                        "label": question_option.question.label,
+                        "tooltip": question_option.question.tooltip,
+                        "is_mandatory": question_option.is_mandatory,
+                        "choices": [
+                            [choice.pk, str(choice)]
+                            for choice in question_option.predefinedansweroptions_set.all()
+                        ],
+                    }
+                    for question_option in question_options
+                    if question_option.category_id == category_id
+                ],
+            }
+        )
+
+    return schema
@@ -1,6 +1,4 @@
 from datetime import datetime
-from functools import partial
-from operator import is_not
 
 import pytz
 from bootstrap_datepicker_plus.widgets import DateTimePickerInput
@@ -12,11 +10,26 @@ from django.utils.translation import gettext_lazy
 from django_countries import countries
 from django_otp.forms import OTPAuthenticationForm
 
+from governanceplatform.caching import (
+    IMPACT_CHOICES_CACHE,
+    REGULATION_CHOICES_CACHE,
+    REGULATOR_CHOICES_CACHE,
+    SECTOR_CHOICES_CACHE,
+    get_or_compute,
+    get_or_compute_translated,
+)
 from governanceplatform.helpers import get_active_company_from_session
 from governanceplatform.models import Regulation, Regulator, Sector, Service
+from governanceplatform.sector_tree import (
+    get_sector,
+    get_sector_name,
+    get_sector_parent,
+    get_sector_tree,
+)
 from governanceplatform.settings import TIME_ZONE
 from theme.globals import REGIONAL_AREA
 
+from .form_schema import get_workflow_schema
 from .models import Answer, Incident, IncidentWorkflow, SectorRegulation
 
 
@@ -160,14 +173,45 @@ class AuthenticationForm(OTPAuthenticationForm):
     otp_challenge = forms.CharField(required=False, widget=forms.HiddenInput)
 
 
+def get_initial_answers(incident_workflow):
+    """
+    Return the answers of the report by question id, the latest first.
+
+    Each answer is a tuple of the answer text and the ids of the selected predefined
+    answers ([None] when there is none). Everything is fetched in one query.
+    """
+    initial_answers = {}
+    if incident_workflow is None:
+        return initial_answers
+
+    answers = {}
+    for question_id, answer_id, answer, predefined_answer_option_id in (
+        Answer.objects.filter(incident_workflow=incident_workflow)
+        .order_by("-timestamp", "-pk")
+        .values_list(
+            "question_options__question_id",
+            "pk",
+            "answer",
+            "predefined_answer_options",
+        )
+    ):
+        if answer_id not in answers:
+            answers[answer_id] = (answer, [])
+            initial_answers.setdefault(question_id, []).append(answers[answer_id])
+        answers[answer_id][1].append(predefined_answer_option_id)
+
+    return initial_answers
+
+
 # create a form for each category and add fields which represent questions
 class QuestionForm(forms.Form):
     # for dynamicly add question to forms
-    def create_question(self, question_option, incident_workflow=None, incident=None):
+    def create_question(self, question, answers):
         initial_data = []
-        field_name = "__question__" + str(question_option.id)
-        question = question_option.question
-        question_type = question_option.question.question_type
+        field_name = "__question__" + str(question["id"])
+        question_type = question["question_type"]
+        # text of the latest answer
+        answer = answers[0][0] if answers else None
 
         if (
             question_type == "MULTI"
@@ -177,77 +221,53 @@ class QuestionForm(forms.Form):
         ):
             initial_answer = ""
             input_type = "checkbox"
-            choices = []
             if question_type == "SO" or question_type == "ST":
                 input_type = "radio"
-            if incident_workflow:
-                pass
-            elif incident:
-                incident_workflow = incident.get_latest_incident_workflow()
-
-            initial_data = list(
-                Answer.objects.values_list("predefined_answer_options", flat=True)
-                .filter(
-                    question_options__question=question,
-                    incident_workflow=incident_workflow,
-                )
-                .order_by("-timestamp")
-            )
-            for choice in question_option.predefinedansweroptions_set.all():
-                choices.append([choice.id, choice])
+
+            initial_data = [
+                predefined_answer_option_id
+                for _answer, predefined_answer_option_ids in answers
+                for predefined_answer_option_id in predefined_answer_option_ids
+            ]
+            choices = question["choices"]
             if question_type == "MULTI" or question_type == "MT":
                 self.fields[field_name] = forms.MultipleChoiceField(
-                    required=question_option.is_mandatory,
+                    required=question["is_mandatory"],
                     choices=choices,
                     widget=forms.CheckboxSelectMultiple(
                         attrs={
-                            "title": question.tooltip,
+                            "title": question["tooltip"],
                             "data-bs-toggle": "tooltip",
                         },
                     ),
-                    label=question.label,
+                    label=question["label"],
                     initial=initial_data,
                 )
             else:
                 self.fields[field_name] = forms.MultipleChoiceField(
-                    required=question_option.is_mandatory,
+                    required=question["is_mandatory"],
                     choices=choices,
                     widget=OtherCheckboxSelectMultiple(
                         input_type=input_type,
                         attrs={
-                            "title": question.tooltip,
+                            "title": question["tooltip"],
                             "data-bs-toggle": "tooltip",
                         },
                     ),
-                    label=question.label,
+                    label=question["label"],
                     initial=initial_data,
                 )
 
             if question_type == "MT" or question_type == "ST":
-                if incident_workflow is not None:
-                    answer = Answer.objects.values_list("answer", flat=True).filter(
-                        question_options__question=question,
-                        incident_workflow=incident_workflow,
-                    )
-                elif incident is not None:
-                    answer = (
-                        Answer.objects.values_list("answer", flat=True)
-                        .filter(
-                            question_options__question=question,
-                            incident_workflow=incident.get_latest_incident_workflow(),
-                        )
-                        .order_by("-timestamp")
-                    )
-                if len(answer) > 0:
-                    if answer[0] != "":
-                        initial_answer = list(filter(partial(is_not, ""), answer))[0]
+                if answer:
+                    initial_answer = answer
                 self.fields[field_name + "_answer"] = forms.CharField(
-                    required=question_option.is_mandatory,
+                    required=question["is_mandatory"],
                     widget=forms.TextInput(
                         attrs={
                             "class": "multichoice-input-freetext",
                             "value": str(initial_answer),
-                            "title": question.tooltip,
+                            "title": question["tooltip"],
                             "data-bs-toggle": "tooltip",
                         }
                     ),
@@ -255,113 +275,53 @@ class QuestionForm(forms.Form):
                 )
         elif question_type == "DATE":
             initial_data = ""
-            answer = None
-            if incident_workflow is not None:
-                answer = (
-                    Answer.objects.values_list("answer", flat=True)
-                    .filter(
-                        question_options__question=question,
-                        incident_workflow=incident_workflow,
-                    )
-                    .first()
-                )
-            elif incident is not None:
-                answer = (
-                    Answer.objects.values_list("answer", flat=True)
-                    .filter(
-                        question_options__question=question,
-                        incident_workflow=incident.get_latest_incident_workflow(),
-                    )
-                    .order_by("-timestamp")
-                    .first()
-                )
-            if answer is not None:
-                if answer != "":
-                    initial_data = answer
-                    initial_data = datetime.strptime(initial_data, "%Y-%m-%d %H:%M")
+            if answer:
+                initial_data = datetime.strptime(answer, "%Y-%m-%d %H:%M")
             self.fields[field_name] = forms.DateTimeField(
                 widget=DateTimePickerInput(
                     options={
                         "maxDate": datetime.today().strftime("%Y-%m-%d 23:59:59"),
                     },
                     attrs={
-                        "title": question.tooltip,
+                        "title": question["tooltip"],
                         "data-bs-toggle": "tooltip",
                     },
                 ),
-                required=question_option.is_mandatory,
+                required=question["is_mandatory"],
                 initial=initial_data,
                 help_text=gettext_lazy("Date Format YYYY-MM-DD HH:MM"),
             )
-            self.fields[field_name].label = question.label
+            self.fields[field_name].label = question["label"]
         elif question_type == "FREETEXT":
             initial_data = ""
-            if incident_workflow is not None:
-                answer = Answer.objects.values_list("answer", flat=True).filter(
-                    question_options__question=question,
-                    incident_workflow=incident_workflow,
-                )
-                if len(answer) > 0:
-                    if answer[0] != "":
-                        initial_data = list(filter(partial(is_not, ""), answer))[0]
-            elif incident is not None:
-                answer = (
-                    Answer.objects.values_list("answer", flat=True)
-                    .filter(
-                        question_options__question=question,
-                        incident_workflow=incident.get_latest_incident_workflow(),
-                    )
-                    .order_by("-timestamp")
-                    .first()
-                )
-                if answer is not None:
-                    if answer != "":
-                        initial_data = answer
+            if answer:
+                initial_data = answer
 
             self.fields[field_name] = forms.CharField(
-                required=question_option.is_mandatory,
+                required=question["is_mandatory"],
                 widget=forms.Textarea(
                     attrs={
                         "rows": 3,
-                        "title": question.tooltip,
+                        "title": question["tooltip"],
                         "data-bs-toggle": "tooltip",
                     }
                 ),
                 initial=str(initial_data),
-                label=question.label,
+                label=question["label"],
             )
         elif question_type == "CL" or question_type == "RL":
             initial_data = ""
-            if incident_workflow is not None:
-                answer = (
-                    Answer.objects.values_list("answer", flat=True)
-                    .filter(
-                        question_options__question=question,
-                        incident_workflow=incident_workflow,
-                    )
-                    .first()
-                )
-            elif incident is not None:
-                answer = (
-                    Answer.objects.values_list("answer", flat=True)
-                    .filter(
-                        question_options__question=question,
-                        incident_workflow=incident.get_latest_incident_workflow(),
-                    )
-                    .order_by("-timestamp")
-                ).first()
             if answer is not None:
-                # initial_data = list(filter(partial(is_not, ""), answer))
                 initial_data = list(filter(None, answer.split(",")))
 
-            if question.question_type == "CL":
+            if question_type == "CL":
                 choices = countries
             else:
                 choices = REGIONAL_AREA
             self.fields[field_name] = forms.MultipleChoiceField(
                 choices=choices,
                 widget=DropdownCheckboxSelectMultiple(),
-                label=question.label,
+                label=question["label"],
                 initial=initial_data,
             )
 
@@ -374,27 +334,20 @@ class QuestionForm(forms.Form):
 
         if incident_workflow:
             workflow = incident_workflow.workflow
+        elif incident:
+            # the answers of the latest report are proposed
+            incident_workflow = incident.get_latest_incident_workflow()
 
-        categories = (
-            workflow.questionoptions_set.select_related("category")
-            .values_list(
-                "category__questioncategoryoptions__question_category__id", flat=True
-            )
-            .distinct()
-            .order_by("category__questioncategoryoptions__position")
-        )
+        categories = get_workflow_schema(workflow)
 
         if position >= len(categories):
             raise ValueError("Position exceeds available categories.")
 
-        category = categories[position]
-
-        category_question_options = workflow.questionoptions_set.filter(
-            category__id=category
-        )
-
-        for question_option in category_question_options:
-            self.create_question(question_option, incident_workflow, incident)
+        initial_answers = get_initial_answers(incident_workflow)
+        for question in categories[position]["questions"]:
+            self.create_question(
+                question, initial_answers.get(question["question_id"], [])
+            )
 
 
 # the first question for preliminary notification
@@ -526,16 +479,15 @@ def construct_services_array(root_sectors):
 
     final_categs = []
     for service in services:
-        if not categs.get(service.sector):
-            categs[service.sector] = [[service.id, service]]
-        else:
-            categs[service.sector].append([service.id, service])
+        categs.setdefault(service.sector_id, []).append([service.id, service])
 
-    for sector, list_of_options in categs.items():
+    sector_tree = get_sector_tree()
+    for sector_id, list_of_options in categs.items():
+        sector = get_sector(sector_id, sector_tree)
         name = sector.name
-        while sector.parent is not None:
-            name = _(sector.parent.name) + " - " + _(name)
-            sector = sector.parent
+        while sector.parent_id is not None:
+            sector = get_sector(sector.parent_id, sector_tree)
+            name = _(sector.name) + " - " + _(name)
         final_categs.append([name, list_of_options])
 
     return final_categs
@@ -557,22 +509,29 @@ class RegulationForm(forms.Form):
             )
 
 
-# prepare an array of regulations
+# prepare an array of regulations, cached by regulators
 def construct_regulation_array(regulators):
-    regulations_id = (
-        SectorRegulation.objects.all()
-        .filter(regulator__in=regulators)
-        .values_list("regulation", flat=True)
-    )
+    regulator_ids = sorted(regulators.values_list("pk", flat=True))
 
-    regulations = (
-        Regulation.objects.all()
-        .filter(id__in=regulations_id)
-        .values_list("id", "translations__label")
-        .distinct("id")
-    )
+    def compute():
+        regulations_id = (
+            SectorRegulation.objects.all()
+            .filter(regulator__in=regulator_ids)
+            .values_list("regulation", flat=True)
+        )
 
-    return regulations
+        regulations = (
+            Regulation.objects.all()
+            .filter(id__in=regulations_id)
+            .values_list("id", "translations__label")
+            .distinct("id")
+        )
+
+        return list(regulations)
+
+    return get_or_compute(
+        REGULATION_CHOICES_CACHE, ["-".join(map(str, regulator_ids))], compute
+    )
 
 
 class RegulatorForm(forms.Form):
@@ -587,14 +546,9 @@ class RegulatorForm(forms.Form):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         try:
-            self.fields["regulators"].choices = [
-                (
-                    regulator.id,
-                    f"{regulator.safe_translation_getter('name', any_language=True)} \
-                    {regulator.safe_translation_getter('full_name', any_language=True)}",
-                )
-                for regulator in Regulator.objects.all()
-            ]
+            self.fields["regulators"].choices = get_or_compute_translated(
+                REGULATOR_CHOICES_CACHE, [], construct_regulator_array
+            )
         except Exception:
             self.fields["regulators"].choices = []
 
@@ -602,6 +556,18 @@ class RegulatorForm(forms.Form):
         return self.fields["regulators"].initial
 
 
+# prepare an array of regulators
+def construct_regulator_array():
+    return [
+        (
+            regulator.id,
+            f"{regulator.safe_translation_getter('name', any_language=True)} \
+                    {regulator.safe_translation_getter('full_name', any_language=True)}",
+        )
+        for regulator in Regulator.objects.prefetch_translations()
+    ]
+
+
 # select the detection date
 class DetectionDateForm(forms.Form):
     incident_timezone = forms.ChoiceField(
@@ -641,10 +607,23 @@ class SectorForm(forms.Form):
             self.fields["sectors"].required = False
 
 
+# prepare an array of sectors by parent sector,
+# cached by sector regulations of the regulations and regulators
 def construct_sectors_array(regulations, regulators):
-    sector_regulations = SectorRegulation.objects.filter(
-        regulation__in=regulations, regulator__in=regulators
+    sector_regulation_ids = sorted(
+        SectorRegulation.objects.filter(
+            regulation__in=regulations, regulator__in=regulators
+        ).values_list("pk", flat=True)
+    )
+
+    return get_or_compute_translated(
+        SECTOR_CHOICES_CACHE,
+        ["-".join(map(str, sector_regulation_ids))],
+        lambda: compute_sectors_array(sector_regulation_ids),
     )
+
+
+def compute_sectors_array(sector_regulations):
     all_sectors = (
         Sector.objects.filter(sectorregulation__in=sector_regulations)
         .distinct()
@@ -652,12 +631,14 @@ def construct_sectors_array(regulations, regulators):
     )
 
     categs = {}
+    sector_tree = get_sector_tree()
 
     for sector in all_sectors:
-        sector_name = sector.get_safe_translation()
+        sector_name = get_sector_name(sector.id, sector_tree)
+        parent = get_sector_parent(sector.id, sector_tree)
 
-        if sector.parent:
-            parent_name = sector.parent.get_safe_translation()
+        if parent is not None:
+            parent_name = parent.name
             categs.setdefault(parent_name, []).append([sector.id, sector_name])
         else:
             if not categs.get(sector_name):
@@ -685,12 +666,7 @@ def get_forms_list(incident=None, workflow=None, is_regulator=False):
         category_tree.append(IncidenteDateForm)
         if workflow is None:
             workflow = incident.get_next_step()
-        categories = (
-            workflow.questionoptions_set.select_related("category")
-            .values_list("category__questioncategoryoptions__id", flat=True)
-            .distinct()
-        )
-        for _category in categories:
+        for _category in get_workflow_schema(workflow):
             category_tree.append(QuestionForm)
         if workflow.is_impact_needed:
             category_tree.append(ImpactForm)
@@ -735,11 +711,21 @@ class ImpactForm(forms.Form):
         widget=ServicesListCheckboxSelectMultiple(initial=None),
     )
 
-    # prepare an array of impacts from incident sectorized
+    # prepare an array of impacts from incident sectorized,
+    # cached by regulation and sectors
     def construct_impact_array(self, incident):
+        regulation_id = incident.sector_regulation.regulation_id
+        sector_ids = sorted(incident.affected_sectors.values_list("pk", flat=True))
+
+        return get_or_compute_translated(
+            IMPACT_CHOICES_CACHE,
+            [regulation_id, "-".join(map(str, sector_ids))],
+            lambda: self.compute_impact_array(regulation_id, sector_ids),
+        )
+
+    def compute_impact_array(self, regulation, sectors):
         impacts_array = []
-        regulation = incident.sector_regulation.regulation
-        for sector in incident.affected_sectors.all():
+        for sector in Sector.objects.filter(pk__in=sectors).order_by("pk"):
             subgroup = []
             if sector.impact_set.filter(regulation=regulation).count() > 0:
                 for impact in sector.impact_set.filter(regulation=regulation):
@@ -0,0 +1,57 @@
+from django.db.models import Prefetch, prefetch_related_objects
+
+from governanceplatform.models import Sector
+
+from .deadlines import compute_incidents_deadlines
+from .forms import IncidentStatusForm, IncidentWorkflowForm
+from .models import IncidentWorkflow, SectorRegulationWorkflow
+
+
+def populate_incidents_page(incidents):
+    """
+    Load the data displayed in the incidents table for one page of incidents.
+
+    The incidents should come from a queryset with select_related("sector_regulation")
+    and must already be sliced to the current page: everything is fetched in a fixed
+    number of queries, whatever the number of incidents or reports.
+    """
+    incidents = list(incidents)
+
+    prefetch_related_objects(
+        incidents,
+        "sector_regulation__translations",
+        Prefetch(
+            "sector_regulation__sectorregulationworkflow_set",
+            queryset=SectorRegulationWorkflow.objects.select_related("workflow")
+            .prefetch_related("workflow__translations")
+            .order_by("position"),
+            to_attr="prefetched_sector_regulation_workflows",
+        ),
+        Prefetch(
+            "incidentworkflow_set",
+            queryset=IncidentWorkflow.objects.select_related("workflow").order_by(
+                "-timestamp"
+            ),
+            to_attr="prefetched_incident_workflows",
+        ),
+        Prefetch(
+            "affected_sectors",
+            queryset=Sector.objects.select_related("parent").prefetch_related(
+                "translations", "parent__translations"
+            ),
+        ),
+    )
+
+    # Needed to add the form for modification of
+    # incident_id, incident_status, significative impact and report status
+    for incident in incidents:
+        incident.formsWorkflow = [
+            IncidentWorkflowForm(instance=workflow_completed)
+            for workflow_completed in incident.get_workflows_completed()
+        ]
+        incident.formsStatus = IncidentStatusForm(instance=incident)
+
+    # due time and exceeded state of each report, used by is_deadline_exceeded
+    compute_incidents_deadlines(incidents)
+
+    return incidents
@@ -0,0 +1,62 @@
+# Generated by Django 5.1.1 on 2026-10-17 00:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("incidents", "0017_alter_question_options_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IncidentDeadline",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "deadline",
+                    models.DateTimeField(db_index=True, verbose_name="Deadline"),
+                ),
+                (
+                    "processed_at",
+                    models.DateTimeField(
+                        blank=True, default=None, null=True, verbose_name="Processed at"
+                    ),
+                ),
+                (
+                    "incident",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="incidents.incident",
+                        verbose_name="Incident",
+                    ),
+                ),
+                (
+                    "workflow",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="incidents.workflow",
+                        verbose_name="Incident report",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Incident report deadline",
+                "verbose_name_plural": "Incident report deadlines",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("incident", "workflow"), name="unique_IncidentDeadline"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def populate_deadlines(apps, schema_editor):
+    # Get the models
+    Incident = apps.get_model("incidents", "Incident")
+    IncidentDeadline = apps.get_model("incidents", "IncidentDeadline")
+    IncidentWorkflow = apps.get_model("incidents", "IncidentWorkflow")
+    SectorRegulationWorkflow = apps.get_model("incidents", "SectorRegulationWorkflow")
+
+    # Queue the deadlines of the reports not yet submitted of the open incidents,
+    # the deadlines already over are marked as processed to not notify them again
+    now = timezone.now()
+    incidents = Incident.objects.filter(
+        incident_status="GOING", sector_regulation__isnull=False
+    )
+    for incident in incidents:
+        latest_submissions = {}
+        for incident_workflow in IncidentWorkflow.objects.filter(
+            incident=incident
+        ).order_by("-timestamp"):
+            latest_submissions.setdefault(
+                incident_workflow.workflow_id, incident_workflow
+            )
+
+        previous_submission = None
+        for sector_regulation_workflow in SectorRegulationWorkflow.objects.filter(
+            sector_regulation_id=incident.sector_regulation_id
+        ).order_by("position"):
+            trigger_event = sector_regulation_workflow.trigger_event_before_deadline
+            start_date = None
+            if trigger_event == "DETECT_DATE":
+                start_date = incident.incident_detection_date
+            elif trigger_event == "NOTIF_DATE":
+                start_date = incident.incident_notification_date
+            elif trigger_event == "PREV_WORK" and previous_submission is not None:
+                start_date = previous_submission.timestamp
+
+            workflow_id = sector_regulation_workflow.workflow_id
+            if start_date is not None and workflow_id not in latest_submissions:
+                deadline = start_date + timedelta(
+                    hours=sector_regulation_workflow.delay_in_hours_before_deadline
+                )
+                IncidentDeadline.objects.get_or_create(
+                    incident=incident,
+                    workflow_id=workflow_id,
+                    defaults={
+                        "deadline": deadline,
+                        "processed_at": now if deadline <= now else None,
+                    },
+                )
+            previous_submission = latest_submissions.get(workflow_id)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("incidents", "0018_incidentdeadline"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_deadlines, migrations.RunPython.noop),
+    ]
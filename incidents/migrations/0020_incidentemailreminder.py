@@ -0,0 +1,63 @@
+# Generated by Django 5.1.1 on 2026-10-17 00:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("incidents", "0019_populate_incidentdeadline"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IncidentEmailReminder",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "send_at",
+                    models.DateTimeField(db_index=True, verbose_name="Send at"),
+                ),
+                (
+                    "sent_at",
+                    models.DateTimeField(
+                        blank=True, default=None, null=True, verbose_name="Sent at"
+                    ),
+                ),
+                (
+                    "incident",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="incidents.incident",
+                        verbose_name="Incident",
+                    ),
+                ),
+                (
+                    "sector_regulation_workflow_email",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="incidents.sectorregulationworkflowemail",
+                        verbose_name="Email for Incident notification workflow",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Incident email reminder",
+                "verbose_name_plural": "Incident email reminders",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("incident", "sector_regulation_workflow_email"),
+                        name="unique_IncidentEmailReminder",
+                    )
+                ],
+            },
+        ),
+    ]
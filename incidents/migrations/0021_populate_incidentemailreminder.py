@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def populate_reminders(apps, schema_editor):
+    # Get the models
+    Incident = apps.get_model("incidents", "Incident")
+    IncidentEmailReminder = apps.get_model("incidents", "IncidentEmailReminder")
+    IncidentWorkflow = apps.get_model("incidents", "IncidentWorkflow")
+    SectorRegulationWorkflow = apps.get_model("incidents", "SectorRegulationWorkflow")
+    SectorRegulationWorkflowEmail = apps.get_model(
+        "incidents", "SectorRegulationWorkflowEmail"
+    )
+
+    # Schedule the reminders of the open incidents,
+    # the reminders already over are marked as sent to not send them again
+    now = timezone.now()
+    incidents = Incident.objects.filter(
+        incident_status="GOING", sector_regulation__isnull=False
+    )
+    for incident in incidents:
+        latest_submissions = {}
+        for incident_workflow in IncidentWorkflow.objects.filter(
+            incident=incident
+        ).order_by("-timestamp"):
+            latest_submissions.setdefault(
+                incident_workflow.workflow_id, incident_workflow
+            )
+
+        previous_submission = None
+        for sector_regulation_workflow in SectorRegulationWorkflow.objects.filter(
+            sector_regulation_id=incident.sector_regulation_id
+        ).order_by("position"):
+            submission = latest_submissions.get(sector_regulation_workflow.workflow_id)
+            if submission is not None:
+                trigger_event, start_date = "NOTIF_DATE", submission.timestamp
+            elif previous_submission is not None:
+                trigger_event, start_date = "PREV_WORK", previous_submission.timestamp
+            else:
+                trigger_event, start_date = None, None
+
+            if start_date is not None:
+                for email in SectorRegulationWorkflowEmail.objects.filter(
+                    sector_regulation_workflow=sector_regulation_workflow,
+                    trigger_event=trigger_event,
+                ):
+                    send_at = start_date + timedelta(hours=email.delay_in_hours)
+                    IncidentEmailReminder.objects.get_or_create(
+                        incident=incident,
+                        sector_regulation_workflow_email=email,
+                        defaults={
+                            "send_at": send_at,
+                            "sent_at": now if send_at <= now else None,
+                        },
+                    )
+            previous_submission = submission
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("incidents", "0020_incidentemailreminder"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_reminders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.1.1 on 2026-10-17 00:52
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("incidents", "0021_populate_incidentemailreminder"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="QueuedEmail",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("subject", models.TextField(verbose_name="Subject")),
+                ("content", models.TextField(verbose_name="Content")),
+                (
+                    "recipients",
+                    models.JSONField(default=list, verbose_name="Recipients"),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="Created at"
+                    ),
+                ),
+                (
+                    "send_after",
+                    models.DateTimeField(
+                        db_index=True,
+                        default=django.utils.timezone.now,
+                        verbose_name="Send after",
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveIntegerField(default=0, verbose_name="Attempts"),
+                ),
+                (
+                    "last_error",
+                    models.TextField(blank=True, default="", verbose_name="Last error"),
+                ),
+                (
+                    "sent_at",
+                    models.DateTimeField(
+                        blank=True, default=None, null=True, verbose_name="Sent at"
+                    ),
+                ),
+                (
+                    "failed_at",
+                    models.DateTimeField(
+                        blank=True, default=None, null=True, verbose_name="Failed at"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Queued email",
+                "verbose_name_plural": "Queued emails",
+            },
+        ),
+    ]
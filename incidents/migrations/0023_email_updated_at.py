@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-17 01:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("incidents", "0022_queuedemail"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="email",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True,
+                default=django.utils.timezone.now,
+                verbose_name="Updated at",
+            ),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.1.1 on 2026-10-17 01:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("incidents", "0023_email_updated_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WizardStepData",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("wizard", models.CharField(max_length=100, verbose_name="Wizard")),
+                ("instance", models.CharField(max_length=100, verbose_name="Instance")),
+                (
+                    "step",
+                    models.CharField(blank=True, max_length=50, verbose_name="Step"),
+                ),
+                ("data", models.JSONField(default=dict, verbose_name="Data")),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Updated at"),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="User",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Wizard step data",
+                "verbose_name_plural": "Wizard steps data",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "wizard", "instance", "step"),
+                        name="unique_WizardStepData",
+                    )
+                ],
+            },
+        ),
+    ]
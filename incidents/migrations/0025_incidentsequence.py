@@ -0,0 +1,50 @@
+# Generated by Django 5.1.1 on 2026-10-17 01:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("governanceplatform", "0024_alter_regulationtranslation_label"),
+        ("incidents", "0024_wizardstepdata"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IncidentSequence",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.PositiveIntegerField(verbose_name="Year")),
+                (
+                    "last_number",
+                    models.PositiveIntegerField(default=0, verbose_name="Last number"),
+                ),
+                (
+                    "company",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="governanceplatform.company",
+                        verbose_name="Company",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Incident sequence",
+                "verbose_name_plural": "Incident sequences",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("company", "year"), name="unique_IncidentSequence"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import ExtractYear
+
+
+def populate_sequences(apps, schema_editor):
+    # Get the models
+    Incident = apps.get_model("incidents", "Incident")
+    IncidentSequence = apps.get_model("incidents", "IncidentSequence")
+
+    # Start the sequences after the incidents already created by company and year
+    counts = (
+        Incident.objects.filter(company__isnull=False)
+        .annotate(year=ExtractYear("incident_notification_date"))
+        .values("company_id", "year")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    IncidentSequence.objects.bulk_create(
+        [
+            IncidentSequence(
+                company_id=row["company_id"],
+                year=row["year"],
+                last_number=row["count"],
+            )
+            for row in counts
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("incidents", "0025_incidentsequence"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.1 on 2026-10-17 01:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("governanceplatform", "0024_alter_regulationtranslation_label"),
+        ("incidents", "0026_populate_incidentsequence"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="incident",
+            index=models.Index(
+                fields=["incident_notification_date", "id"],
+                name="incident_notification_idx",
+            ),
+        ),
+    ]
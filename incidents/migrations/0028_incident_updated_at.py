@@ -0,0 +1,26 @@
+# Generated by Django 5.1.1 on 2026-10-17 01:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("incidents", "0027_incident_notification_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="incident",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, db_index=True, verbose_name="Last update"
+            ),
+        ),
+        migrations.AddField(
+            model_name="incidentworkflow",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, db_index=True, verbose_name="Last update"
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+from django.db.models import F
+
+
+def populate_updated_at(apps, schema_editor):
+    # Get the models
+    Incident = apps.get_model("incidents", "Incident")
+    IncidentWorkflow = apps.get_model("incidents", "IncidentWorkflow")
+
+    # The last change known of the existing incidents and reports is their creation
+    Incident.objects.update(updated_at=F("incident_notification_date"))
+    IncidentWorkflow.objects.update(updated_at=F("timestamp"))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("incidents", "0028_incident_updated_at"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_updated_at, migrations.RunPython.noop),
+    ]
@@ -5,6 +5,7 @@ from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from parler.models import TranslatableModel, TranslatedFields
 
+from governanceplatform.managers import TranslationPrefetchManager
 from governanceplatform.settings import TIME_ZONE
 
 from .globals import (
@@ -58,6 +59,8 @@ class Impact(TranslatableModel):
         default=None,
     )
 
+    objects = TranslationPrefetchManager()
+
     def __str__(self):
         label_translation = self.safe_translation_getter("label", any_language=True)
         return label_translation or ""
@@ -89,6 +92,8 @@ class QuestionCategory(TranslatableModel):
         default=None,
     )
 
+    objects = TranslationPrefetchManager()
+
     def __str__(self):
         label_translation = self.safe_translation_getter("label", any_language=True)
         return label_translation or ""
@@ -128,6 +133,8 @@ class Question(TranslatableModel):
         default=None,
     )
 
+    objects = TranslationPrefetchManager()
+
     def __str__(self):
         label_translation = self.safe_translation_getter("label", any_language=True)
         return label_translation or ""
@@ -159,6 +166,8 @@ class PredefinedAnswer(TranslatableModel):
         default=None,
     )
 
+    objects = TranslationPrefetchManager()
+
     def __str__(self):
         predefined_answer_translation = self.safe_translation_getter(
             "predefined_answer"
@@ -201,6 +210,8 @@ class Email(TranslatableModel, models.Model):
         blank=True,
         default=None,
     )
+    # used to invalidate the compiled templates (see email.py)
+    updated_at = models.DateTimeField(verbose_name=_("Updated at"), auto_now=True)
 
     def __str__(self):
         return self.name or ""
@@ -248,6 +259,8 @@ class Workflow(TranslatableModel):
         default=None,
     )
 
+    objects = TranslationPrefetchManager()
+
     def __str__(self):
         name_translation = self.safe_translation_getter("name", any_language=True)
         return name_translation or ""
@@ -314,6 +327,8 @@ class SectorRegulation(TranslatableModel):
         related_name="report_status_changed_email",
     )
 
+    objects = TranslationPrefetchManager()
+
     class Meta:
         verbose_name_plural = _("Incident notification workflows")
         verbose_name = _("Incident notification workflow")
@@ -519,6 +534,20 @@ class Incident(models.Model):
         blank=False,
         default=INCIDENT_STATUS[1][0],
     )
+    # last change, the external systems fetch the changes since their last
+    # synchronisation (see api/views.py)
+    updated_at = models.DateTimeField(
+        auto_now=True, db_index=True, verbose_name=_("Last update")
+    )
+
+    class Meta:
+        # the incidents are listed by the API in this order (see api/pagination.py)
+        indexes = [
+            models.Index(
+                fields=["incident_notification_date", "id"],
+                name="incident_notification_idx",
+            ),
+        ]
 
     def get_next_step(self):
         current_workflow = (
@@ -549,12 +578,57 @@ class Incident(models.Model):
         return impacts.count() > 0
 
     def get_all_workflows(self):
+        sector_regulation_workflows = self.get_prefetched_sector_regulation_workflows()
+        if sector_regulation_workflows is not None:
+            return [
+                sector_regulation_workflow.workflow
+                for sector_regulation_workflow in sector_regulation_workflows
+            ]
         workflows = self.sector_regulation.workflows.all().order_by(
             "sectorregulationworkflow__position"
         )
         return list(workflows)
 
+    # links between the sector regulation and its reports ordered by position,
+    # only available when loaded by the incident list (see incident_list.py)
+    def get_prefetched_sector_regulation_workflows(self):
+        return getattr(
+            self.sector_regulation, "prefetched_sector_regulation_workflows", None
+        )
+
+    def get_sector_regulation_workflows(self):
+        sector_regulation_workflows = self.get_prefetched_sector_regulation_workflows()
+        if sector_regulation_workflows is not None:
+            return sector_regulation_workflows
+        return list(
+            SectorRegulationWorkflow.objects.filter(
+                sector_regulation=self.sector_regulation
+            )
+            .select_related("workflow")
+            .order_by("position")
+        )
+
+    # incident workflows ordered by -timestamp,
+    # only available when loaded by the incident list (see incident_list.py)
+    def get_prefetched_incident_workflows(self):
+        return getattr(self, "prefetched_incident_workflows", None)
+
     def get_workflows_completed(self):
+        incident_workflows = self.get_prefetched_incident_workflows()
+        sector_regulation_workflows = self.get_prefetched_sector_regulation_workflows()
+        if incident_workflows is not None and sector_regulation_workflows is not None:
+            positions = {
+                sector_regulation_workflow.workflow_id: sector_regulation_workflow.position
+                or 0
+                for sector_regulation_workflow in sector_regulation_workflows
+            }
+            # sorted() is stable so the -timestamp order is kept for each report
+            return sorted(
+                incident_workflows,
+                key=lambda incident_workflow: positions.get(
+                    incident_workflow.workflow_id, 0
+                ),
+            )
         workflows = (
             self.incidentworkflow_set.all()
             .order_by("workflow__sectorregulationworkflow__position", "-timestamp")
@@ -564,6 +638,15 @@ class Incident(models.Model):
 
     # TO DO : check if it returns always the correct values
     def get_latest_incident_workflows(self):
+        prefetched_incident_workflows = self.get_prefetched_incident_workflows()
+        if prefetched_incident_workflows is not None:
+            latest_incident_workflows = {}
+            for incident_workflow in prefetched_incident_workflows:
+                latest_incident_workflows.setdefault(
+                    incident_workflow.workflow_id, incident_workflow
+                )
+            return list(latest_incident_workflows.values())
+
         incident_workflows = (
             IncidentWorkflow.objects.filter(
                 incident=self,
@@ -575,6 +658,10 @@ class Incident(models.Model):
         return incident_workflows
 
     def get_latest_incident_workflow(self):
+        prefetched_incident_workflows = self.get_prefetched_incident_workflows()
+        if prefetched_incident_workflows is not None:
+            return next(iter(prefetched_incident_workflows), None)
+
         incident_workflow = (
             IncidentWorkflow.objects.filter(
                 incident=self,
@@ -586,6 +673,17 @@ class Incident(models.Model):
         return incident_workflow
 
     def get_latest_incident_workflow_by_workflow(self, workflow):
+        prefetched_incident_workflows = self.get_prefetched_incident_workflows()
+        if prefetched_incident_workflows is not None:
+            return next(
+                (
+                    incident_workflow
+                    for incident_workflow in prefetched_incident_workflows
+                    if incident_workflow.workflow_id == workflow.id
+                ),
+                None,
+            )
+
         incident_workflow = (
             IncidentWorkflow.objects.filter(
                 incident=self,
@@ -598,6 +696,15 @@ class Incident(models.Model):
         return incident_workflow
 
     def get_previous_workflow(self, workflow):
+        sector_regulation_workflows = self.get_prefetched_sector_regulation_workflows()
+        if sector_regulation_workflows is not None:
+            previous = False
+            for sector_regulation_workflow in sector_regulation_workflows:
+                if sector_regulation_workflow.workflow_id == workflow.id:
+                    return previous
+                previous = sector_regulation_workflow
+            return False
+
         current = (
             SectorRegulationWorkflow.objects.all()
             .filter(
@@ -719,6 +826,10 @@ class IncidentWorkflow(models.Model):
         default=None,
     )
     comment = models.TextField(verbose_name=_("Comment"), null=True, blank=True)
+    # last change, see Incident.updated_at
+    updated_at = models.DateTimeField(
+        auto_now=True, db_index=True, verbose_name=_("Last update")
+    )
 
     class meta:
         verbose_name_plural = _("Incident")
@@ -773,6 +884,166 @@ class IncidentWorkflow(models.Model):
         return False
 
 
+# next deadline of each report not yet submitted for an open incident,
+# the rows are processed by the workflow_update_status script
+class IncidentDeadline(models.Model):
+    incident = models.ForeignKey(
+        Incident, on_delete=models.CASCADE, verbose_name=_("Incident")
+    )
+    workflow = models.ForeignKey(
+        Workflow, on_delete=models.CASCADE, verbose_name=_("Incident report")
+    )
+    deadline = models.DateTimeField(verbose_name=_("Deadline"), db_index=True)
+    # set when the deadline has been processed (report marked as out of time)
+    processed_at = models.DateTimeField(
+        verbose_name=_("Processed at"), null=True, blank=True, default=None
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["incident", "workflow"], name="unique_IncidentDeadline"
+            ),
+        ]
+        verbose_name_plural = _("Incident report deadlines")
+        verbose_name = _("Incident report deadline")
+
+
+# reminder email to send for an incident,
+# the rows are processed by the email_reminder script
+class IncidentEmailReminder(models.Model):
+    incident = models.ForeignKey(
+        Incident, on_delete=models.CASCADE, verbose_name=_("Incident")
+    )
+    sector_regulation_workflow_email = models.ForeignKey(
+        SectorRegulationWorkflowEmail,
+        on_delete=models.CASCADE,
+        verbose_name=_("Email for Incident notification workflow"),
+    )
+    send_at = models.DateTimeField(verbose_name=_("Send at"), db_index=True)
+    # set when the email has been sent
+    sent_at = models.DateTimeField(
+        verbose_name=_("Sent at"), null=True, blank=True, default=None
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["incident", "sector_regulation_workflow_email"],
+                name="unique_IncidentEmailReminder",
+            ),
+        ]
+        verbose_name_plural = _("Incident email reminders")
+        verbose_name = _("Incident email reminder")
+
+
+# outgoing email waiting to be sent by the send_queued_emails script
+class QueuedEmail(models.Model):
+    subject = models.TextField(verbose_name=_("Subject"))
+    content = models.TextField(verbose_name=_("Content"))
+    recipients = models.JSONField(verbose_name=_("Recipients"), default=list)
+    created_at = models.DateTimeField(
+        verbose_name=_("Created at"), default=timezone.now
+    )
+    # not sent before this date, postponed after each failed attempt
+    send_after = models.DateTimeField(
+        verbose_name=_("Send after"), default=timezone.now, db_index=True
+    )
+    attempts = models.PositiveIntegerField(verbose_name=_("Attempts"), default=0)
+    last_error = models.TextField(verbose_name=_("Last error"), blank=True, default="")
+    sent_at = models.DateTimeField(
+        verbose_name=_("Sent at"), null=True, blank=True, default=None
+    )
+    # set when the email is given up after too many attempts
+    failed_at = models.DateTimeField(
+        verbose_name=_("Failed at"), null=True, blank=True, default=None
+    )
+
+    class Meta:
+        verbose_name_plural = _("Queued emails")
+        verbose_name = _("Queued email")
+
+    def __str__(self):
+        return self.subject
+
+
+# data of a step of a form wizard being filled (see wizard_storage.py)
+class WizardStepData(models.Model):
+    user = models.ForeignKey(
+        "governanceplatform.User", on_delete=models.CASCADE, verbose_name=_("User")
+    )
+    # name of the wizard and edited incident and report
+    wizard = models.CharField(max_length=100, verbose_name=_("Wizard"))
+    instance = models.CharField(max_length=100, verbose_name=_("Instance"))
+    # empty for the current step and the extra data of the wizard
+    step = models.CharField(max_length=50, verbose_name=_("Step"), blank=True)
+    data = models.JSONField(verbose_name=_("Data"), default=dict)
+    updated_at = models.DateTimeField(verbose_name=_("Updated at"), auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "wizard", "instance", "step"],
+                name="unique_WizardStepData",
+            ),
+        ]
+        verbose_name_plural = _("Wizard steps data")
+        verbose_name = _("Wizard step data")
+
+
+# ZIP archive of the PDF reports of many incidents, built by the build_pdf_archives
+# script (see pdf_generation.py)
+class PdfArchive(models.Model):
+    user = models.ForeignKey(
+        "governanceplatform.User", on_delete=models.CASCADE, verbose_name=_("User")
+    )
+    incident_ids = models.JSONField(verbose_name=_("Incidents"), default=list)
+    # the reports are rendered in the language of the user
+    language = models.CharField(max_length=10, verbose_name=_("Language"))
+    created_at = models.DateTimeField(
+        verbose_name=_("Created at"), default=timezone.now
+    )
+    # set when a worker starts to build the archive
+    started_at = models.DateTimeField(
+        verbose_name=_("Started at"), null=True, blank=True, default=None
+    )
+    finished_at = models.DateTimeField(
+        verbose_name=_("Finished at"), null=True, blank=True, default=None
+    )
+    failed_at = models.DateTimeField(
+        verbose_name=_("Failed at"), null=True, blank=True, default=None
+    )
+    last_error = models.TextField(verbose_name=_("Last error"), blank=True, default="")
+
+    class Meta:
+        verbose_name_plural = _("PDF archives")
+        verbose_name = _("PDF archive")
+
+    def __str__(self):
+        return f"{self.user} {self.created_at}"
+
+
+# last number given to an incident of the company in the year,
+# used to build the incident identifiers (see sequences.py)
+class IncidentSequence(models.Model):
+    company = models.ForeignKey(
+        "governanceplatform.Company",
+        on_delete=models.CASCADE,
+        verbose_name=_("Company"),
+    )
+    year = models.PositiveIntegerField(verbose_name=_("Year"))
+    last_number = models.PositiveIntegerField(verbose_name=_("Last number"), default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["company", "year"], name="unique_IncidentSequence"
+            ),
+        ]
+        verbose_name_plural = _("Incident sequences")
+        verbose_name = _("Incident sequence")
+
+
 # record who has read the reports
 class LogReportRead(models.Model):
     user = models.ForeignKey(
@@ -1,25 +1,248 @@
+import hashlib
+import json
+import logging
+import multiprocessing
 import os
-from typing import Dict, List
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from itertools import repeat
+from typing import BinaryIO, Dict, List, Optional
 
+import django
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch, Q, prefetch_related_objects
 from django.http import HttpRequest
 from django.template.loader import render_to_string
+from django.utils import timezone, translation
+from django.utils.translation import gettext as _
 from weasyprint import CSS, HTML
 
-from .models import Answer, Incident, IncidentWorkflow
+from governanceplatform.caching import IMPACT_CHOICES_CACHE, get_cache_version
+from governanceplatform.sector_tree import (
+    SECTOR_TREE_CACHE,
+    get_sector_name,
+    get_sector_parent,
+    get_sector_tree,
+)
+
+from .form_schema import WORKFLOW_SCHEMA_CACHE
+from .models import (
+    Answer,
+    Impact,
+    Incident,
+    IncidentWorkflow,
+    LogReportRead,
+    PdfArchive,
+    PredefinedAnswerOptions,
+)
+
+logger = logging.getLogger(__name__)
+
+# size of the chunks of the streamed ZIP archives
+ZIP_CHUNK_SIZE = 64 * 1024
+# the PDF reports not downloaded for this time are removed from PDF_CACHE_DIR
+PDF_CACHE_MAX_AGE = timedelta(days=30)
+# directory of PDF_CACHE_DIR keeping the archives built by build_pdf_archives
+PDF_ARCHIVES_DIR = "archives"
+# the archives are removed after this time
+PDF_ARCHIVE_MAX_AGE = timedelta(days=7)
+# an archive started longer ago is built again, its worker was stopped
+PDF_ARCHIVE_TIMEOUT = timedelta(hours=2)
+
+# stylesheets of the reports, parsed once by process
+report_stylesheets: Dict[str, CSS] = {}
+
+
+def get_report_stylesheets(static_theme_dir: str) -> List[CSS]:
+    stylesheets = []
+    for css_file in ["css/custom.css", "css/report.css"]:
+        css_path = os.path.join(static_theme_dir, css_file)
+        key = f"{css_path}:{os.path.getmtime(css_path)}"
+        if key not in report_stylesheets:
+            report_stylesheets[key] = CSS(css_path)
+        stylesheets.append(report_stylesheets[key])
+    return stylesheets
 
 
 def get_pdf_report(
     incident: Incident, incident_workflow: IncidentWorkflow, request: HttpRequest
 ):
+    return render_pdf_report(
+        get_pdf_report_context(incident, incident_workflow), request
+    )
+
+
+def get_pdf_report_file(
+    incident: Incident,
+    incident_workflow: Optional[IncidentWorkflow],
+    request: HttpRequest,
+) -> BinaryIO:
+    """
+    Return the PDF report opened for reading, rendered only if the data changed.
+
+    The files are stored in PDF_CACHE_DIR by incident, named by report and by a
+    hash of the data of the report, the previous versions are removed. The file is
+    returned open, so it can still be read if a concurrent render, an invalidation
+    or the purge removes it. It is rendered again once if it is removed while it is
+    written.
+    """
+    try:
+        return open_pdf_report_file(incident, incident_workflow, request)
+    except FileNotFoundError:
+        return open_pdf_report_file(incident, incident_workflow, request)
+
+
+def open_pdf_report_file(
+    incident: Incident,
+    incident_workflow: Optional[IncidentWorkflow],
+    request: HttpRequest,
+) -> BinaryIO:
+    report_name = f"report_{incident_workflow.pk}" if incident_workflow else "incident"
+    incident_dir = os.path.join(settings.PDF_CACHE_DIR, str(incident.pk))
+    pdf_file_name = (
+        f"{report_name}_{get_pdf_report_hash(incident, incident_workflow)}.pdf"
+    )
+    pdf_path = os.path.join(incident_dir, pdf_file_name)
+    try:
+        pdf_file = open(pdf_path, "rb")
+    except FileNotFoundError:
+        pass
+    else:
+        # the access time tells the purge the report is still used
+        os.utime(pdf_file.fileno())
+        return pdf_file
+
+    context = get_pdf_report_context(incident, incident_workflow)
+    pdf_report = render_pdf_report(context, request)
+
+    os.makedirs(incident_dir, exist_ok=True)
+    for file_name in os.listdir(incident_dir):
+        # the same version may have been written by a concurrent render
+        if file_name.startswith(f"{report_name}_") and file_name != pdf_file_name:
+            try:
+                os.remove(os.path.join(incident_dir, file_name))
+            except FileNotFoundError:
+                pass
+    # written in a temporary file first, a concurrent download never reads half a file
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=incident_dir)
+    pdf_file = os.fdopen(file_descriptor, "w+b")
+    try:
+        pdf_file.write(pdf_report)
+        pdf_file.flush()
+        os.replace(temporary_path, pdf_path)
+    except BaseException:
+        pdf_file.close()
+        try:
+            os.remove(temporary_path)
+        except FileNotFoundError:
+            pass
+        raise
+    pdf_file.seek(0)
+
+    return pdf_file
+
+
+# remove the PDF reports of the incident, called when the data of the incident change
+def invalidate_pdf_reports(incident: Incident):
+    shutil.rmtree(
+        os.path.join(settings.PDF_CACHE_DIR, str(incident.pk)), ignore_errors=True
+    )
+
+
+# remove the PDF reports not used for PDF_CACHE_MAX_AGE and the ones of the deleted
+# incidents, called by the purge_pdf_cache script
+def purge_pdf_reports(now: Optional[datetime] = None) -> int:
+    if now is None:
+        now = timezone.now()
+    if not os.path.isdir(settings.PDF_CACHE_DIR):
+        return 0
+
+    limit = (now - PDF_CACHE_MAX_AGE).timestamp()
+    incident_dirs = os.listdir(settings.PDF_CACHE_DIR)
+    existing_ids = {
+        str(pk)
+        for pk in Incident.objects.filter(
+            pk__in=[name for name in incident_dirs if name.isdigit()]
+        ).values_list("pk", flat=True)
+    }
+
+    removed = 0
+    for name in incident_dirs:
+        incident_dir = os.path.join(settings.PDF_CACHE_DIR, name)
+        if name == PDF_ARCHIVES_DIR or not os.path.isdir(incident_dir):
+            continue
+        if name not in existing_ids:
+            shutil.rmtree(incident_dir, ignore_errors=True)
+            continue
+        for file_name in os.listdir(incident_dir):
+            file_path = os.path.join(incident_dir, file_name)
+            try:
+                if os.path.getmtime(file_path) < limit:
+                    os.remove(file_path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        try:
+            os.rmdir(incident_dir)
+        except OSError:
+            # not empty
+            pass
+
+    return removed
+
+
+# hash of the versions of everything displayed in the report, computed without
+# loading the report: the reports are saved again when they change, and the
+# versions of the cached sectors, questions and impacts change with their labels
+def get_pdf_report_hash(
+    incident: Incident, incident_workflow: Optional[IncidentWorkflow]
+) -> str:
+    if incident_workflow is None:
+        report_list = incident.get_latest_incident_workflows()
+    else:
+        report_list = [incident_workflow]
+
+    static_theme_dir = settings.STATIC_THEME_DIR
+    data = {
+        "language": translation.get_language(),
+        "incident": [incident.pk, incident.updated_at],
+        "sectors": sorted(incident.affected_sectors.values_list("id", flat=True)),
+        "reports": [[report.pk, report.updated_at] for report in report_list],
+        "versions": [
+            get_cache_version(namespace)
+            for namespace in [
+                SECTOR_TREE_CACHE,
+                WORKFLOW_SCHEMA_CACHE,
+                IMPACT_CHOICES_CACHE,
+            ]
+        ],
+        "stylesheets": [
+            os.path.getmtime(os.path.join(static_theme_dir, css_file))
+            for css_file in ["css/custom.css", "css/report.css"]
+        ],
+    }
+    return hashlib.sha256(
+        json.dumps(data, default=str, sort_keys=True).encode()
+    ).hexdigest()
+
+
+def get_pdf_report_context(
+    incident: Incident, incident_workflow: Optional[IncidentWorkflow]
+) -> Dict:
     # TO DO : improve for more than 2 level ?
     sectors: Dict[str, List[str]] = {}
+    sector_tree = get_sector_tree()
 
-    for sector in incident.affected_sectors.all():
-        sector_name = sector.get_safe_translation()
+    for sector_id in incident.affected_sectors.values_list("id", flat=True):
+        sector_name = get_sector_name(sector_id, sector_tree)
+        parent = get_sector_parent(sector_id, sector_tree)
 
-        if sector.parent:
-            parent_name = sector.parent.get_safe_translation()
+        if parent is not None:
+            parent_name = parent.name
             sectors.setdefault(parent_name, []).append(sector_name)
         else:
             if sector_name not in sectors:
@@ -29,28 +252,75 @@ def get_pdf_report(
     incident_workflows_impact: Dict[str, List[str]] = {}
     # display for the full incident or just a report
     if incident_workflow is None:
-        report_list = incident.get_latest_incident_workflows()
+        report_list = list(incident.get_latest_incident_workflows())
     else:
         report_list = [incident_workflow]
 
+    load_reports_data(report_list)
+
     for incident_workflow in report_list:
         workflow_name = incident_workflow.workflow
         incident_workflows_answer.setdefault(workflow_name, dict())
         incident_workflows_impact.setdefault(workflow_name, [])
 
-        answers = Answer.objects.filter(incident_workflow=incident_workflow).order_by(
-            "question_options__position"
-        )
-        for answer in answers:
+        for answer in incident_workflow.prefetched_answers:
             populate_questions_answers(
                 answer,
                 incident_workflows_answer[workflow_name],
             )
         # impacts
         incident_workflows_impact[workflow_name].extend(
-            incident_workflow.impacts.all().order_by("translations__label").distinct()
+            sorted(
+                incident_workflow.impacts.all(),
+                key=lambda impact: impact.safe_translation_getter(
+                    "label", default="", any_language=True
+                ),
+            )
         )
 
+    return {
+        "incident": incident,
+        "report_list": report_list,
+        "incident_workflows_answer": incident_workflows_answer,
+        "incident_workflows_impact": incident_workflows_impact,
+        "sectors": sectors,
+    }
+
+
+def load_reports_data(report_list: List[IncidentWorkflow]):
+    """
+    Load the answers and impacts of the reports in a fixed number of queries.
+
+    The answers of each report are set in the prefetched_answers attribute, ordered
+    by question position, with their questions, categories, predefined answers and
+    translations.
+    """
+    prefetch_related_objects(
+        report_list,
+        "workflow__translations",
+        Prefetch(
+            "answer_set",
+            queryset=Answer.objects.select_related(
+                "question_options__question", "question_options__category"
+            )
+            .prefetch_related(
+                "question_options__question__translations",
+                "question_options__category__translations",
+                Prefetch(
+                    "predefined_answer_options",
+                    queryset=PredefinedAnswerOptions.objects.select_related(
+                        "predefined_answer"
+                    ).prefetch_related("predefined_answer__translations"),
+                ),
+            )
+            .order_by("question_options__position"),
+            to_attr="prefetched_answers",
+        ),
+        Prefetch("impacts", queryset=Impact.objects.prefetch_translations()),
+    )
+
+
+def render_pdf_report(context: Dict, request: HttpRequest) -> bytes:
     # Render the HTML file
 
     static_theme_dir = settings.STATIC_THEME_DIR
@@ -59,22 +329,17 @@ def get_pdf_report(
         "report/template.html",
         {
             "static_theme_dir": os.path.abspath(static_theme_dir),
-            "incident": incident,
-            "incident_workflows_answer": incident_workflows_answer,
-            "incident_workflows_impact": incident_workflows_impact,
-            "sectors": sectors,
+            "incident": context["incident"],
+            "incident_workflows_answer": context["incident_workflows_answer"],
+            "incident_workflows_impact": context["incident_workflows_impact"],
+            "sectors": context["sectors"],
         },
         request=request,
     )
 
     htmldoc = HTML(string=output_from_parsed_template, base_url=static_theme_dir)
 
-    stylesheets = [
-        CSS(os.path.join(static_theme_dir, "css/custom.css")),
-        CSS(os.path.join(static_theme_dir, "css/report.css")),
-    ]
-
-    return htmldoc.write_pdf(stylesheets=stylesheets)
+    return htmldoc.write_pdf(stylesheets=get_report_stylesheets(static_theme_dir))
 
 
 def populate_questions_answers(answer: Answer, preliminary_questions_answers: Dict):
@@ -91,3 +356,210 @@ def populate_questions_answers(answer: Answer, preliminary_questions_answers: Di
         answer_list.extend(predefined_answers)
     else:
         answer_list.append(answer.answer)
+
+
+class ZipStream:
+    """Unseekable file receiving the ZIP archive, emptied as the archive is sent."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer.extend(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self) -> bytes:
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def stream_pdf_reports_zip(incidents, request: HttpRequest, on_report=None):
+    """
+    Yield a ZIP archive of the PDF reports of the incidents, chunk by chunk.
+
+    The reports are taken from the PDF cache (rendered if needed) and copied by
+    chunks, at most one chunk is in memory. on_report is called with each incident
+    added to the archive. The incidents whose report could not be generated are
+    listed in a README.txt file at the end of the archive.
+    """
+    stream = ZipStream()
+    failed_incidents = []
+    with zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_STORED) as archive:
+        for incident in incidents:
+            try:
+                pdf_file = get_pdf_report_file(incident, None, request)
+            except Exception:
+                logger.exception("Generation of the report of %s failed", incident.pk)
+                failed_incidents.append(incident.incident_id)
+                continue
+
+            with pdf_file, archive.open(
+                f"Incident_{incident.incident_id}_{incident.pk}.pdf", "w"
+            ) as archive_file:
+                while chunk := pdf_file.read(ZIP_CHUNK_SIZE):
+                    archive_file.write(chunk)
+                    yield stream.pop()
+            if on_report is not None:
+                on_report(incident)
+            yield stream.pop()
+
+        if failed_incidents:
+            archive.writestr(
+                "README.txt",
+                "\n".join(
+                    [_("The report of these incidents could not be generated:")]
+                    + failed_incidents
+                )
+                + "\n",
+            )
+    yield stream.pop()
+
+
+def get_pdf_archive_path(pdf_archive: PdfArchive) -> str:
+    return os.path.join(
+        settings.PDF_CACHE_DIR, PDF_ARCHIVES_DIR, f"{pdf_archive.pk}.zip"
+    )
+
+
+def build_pdf_archives() -> int:
+    """
+    Build the queued ZIP archives of PDF reports, one at a time.
+
+    An archive is claimed with SELECT ... FOR UPDATE SKIP LOCKED, so several
+    workers can run at the same time, and built again if its worker was stopped.
+    Return the number of archives built.
+    """
+    built = 0
+    while True:
+        now = timezone.now()
+        with transaction.atomic():
+            pdf_archive = (
+                PdfArchive.objects.select_for_update(skip_locked=True)
+                .filter(
+                    Q(started_at__isnull=True)
+                    | Q(started_at__lt=now - PDF_ARCHIVE_TIMEOUT),
+                    finished_at__isnull=True,
+                    failed_at__isnull=True,
+                )
+                .order_by("created_at", "pk")
+                .first()
+            )
+            if pdf_archive is None:
+                return built
+            pdf_archive.started_at = now
+            pdf_archive.save(update_fields=["started_at"])
+
+        if build_pdf_archive(pdf_archive):
+            built += 1
+
+
+def build_pdf_archive(pdf_archive: PdfArchive) -> bool:
+    """
+    Render the missing reports of the archive in parallel, then write the archive
+    file from the PDF cache.
+    """
+    archive_path = get_pdf_archive_path(pdf_archive)
+    temporary_path = None
+    try:
+        with translation.override(pdf_archive.language):
+            render_pdf_reports(pdf_archive.incident_ids)
+
+            incidents = Incident.objects.filter(
+                pk__in=pdf_archive.incident_ids
+            ).order_by("-incident_notification_date")
+            os.makedirs(os.path.dirname(archive_path), exist_ok=True)
+            file_descriptor, temporary_path = tempfile.mkstemp(
+                dir=os.path.dirname(archive_path)
+            )
+            with os.fdopen(file_descriptor, "wb") as archive_file:
+                for chunk in stream_pdf_reports_zip(
+                    incidents.iterator(),
+                    None,
+                    on_report=lambda incident: LogReportRead.objects.create(
+                        user=pdf_archive.user, incident=incident, action="DOWNLOAD"
+                    ),
+                ):
+                    archive_file.write(chunk)
+            os.replace(temporary_path, archive_path)
+    except Exception as e:
+        logger.exception("Build of the PDF archive %s failed", pdf_archive.pk)
+        if temporary_path is not None and os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        pdf_archive.failed_at = timezone.now()
+        pdf_archive.last_error = str(e)
+        pdf_archive.save(update_fields=["failed_at", "last_error"])
+        return False
+
+    pdf_archive.finished_at = timezone.now()
+    pdf_archive.save(update_fields=["finished_at"])
+    return True
+
+
+def render_pdf_reports(incident_ids: List[int]):
+    """
+    Put the reports of the incidents in the PDF cache, rendered in
+    PDF_RENDER_PROCESSES processes.
+
+    The processes are started with spawn, so they do not share the database
+    connections of the worker, and are stopped once the reports are rendered.
+    """
+    language = translation.get_language()
+    if settings.PDF_RENDER_PROCESSES <= 1:
+        for incident_id in incident_ids:
+            render_pdf_report_process(incident_id, language)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=settings.PDF_RENDER_PROCESSES,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=django.setup,
+    ) as pool:
+        list(pool.map(render_pdf_report_process, incident_ids, repeat(language)))
+
+
+# run in the processes of render_pdf_reports, a failed report is rendered again
+# when the archive is written and listed in its README.txt file if it fails again
+def render_pdf_report_process(incident_id: int, language: str):
+    with translation.override(language):
+        incident = Incident.objects.filter(pk=incident_id).first()
+        if incident is None:
+            return
+        try:
+            get_pdf_report_file(incident, None, None).close()
+        except Exception:
+            logger.exception("Generation of the report of %s failed", incident_id)
+
+
+# remove the archives older than PDF_ARCHIVE_MAX_AGE and the files without archive,
+# called by the purge_pdf_cache script
+def purge_pdf_archives(now: Optional[datetime] = None) -> int:
+    if now is None:
+        now = timezone.now()
+
+    removed, _deleted = PdfArchive.objects.filter(
+        created_at__lt=now - PDF_ARCHIVE_MAX_AGE
+    ).delete()
+
+    archives_dir = os.path.join(settings.PDF_CACHE_DIR, PDF_ARCHIVES_DIR)
+    if not os.path.isdir(archives_dir):
+        return removed
+    limit = (now - PDF_ARCHIVE_TIMEOUT).timestamp()
+    archive_file_names = {
+        f"{pk}.zip" for pk in PdfArchive.objects.values_list("pk", flat=True)
+    }
+    for file_name in os.listdir(archives_dir):
+        file_path = os.path.join(archives_dir, file_name)
+        try:
+            # the temporary files of the archives being built are kept
+            if file_name not in archive_file_names and (
+                file_name.endswith(".zip") or os.path.getmtime(file_path) < limit
+            ):
+                os.remove(file_path)
+        except FileNotFoundError:
+            pass
+
+    return removed
@@ -0,0 +1,144 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .email import send_emails
+from .models import IncidentEmailReminder, SectorRegulationWorkflowEmail
+
+# number of reminders claimed at once by a worker
+REMINDERS_BATCH_SIZE = 100
+
+
+def get_incident_reminders(incident):
+    """
+    Return the send time of each reminder email of the incident by email id.
+
+    NOTIF_DATE emails are sent after the latest submission of their report,
+    PREV_WORK emails after the latest submission of the previous report as long as
+    their report is not submitted.
+    """
+    latest_submissions = {
+        incident_workflow.workflow_id: incident_workflow
+        for incident_workflow in incident.get_latest_incident_workflows()
+    }
+    sector_regulation_workflows = incident.get_sector_regulation_workflows()
+    emails = SectorRegulationWorkflowEmail.objects.filter(
+        sector_regulation_workflow__in=sector_regulation_workflows
+    )
+
+    start_dates = {}
+    previous_submission = None
+    for sector_regulation_workflow in sector_regulation_workflows:
+        submission = latest_submissions.get(sector_regulation_workflow.workflow_id)
+        if submission is not None:
+            start_dates[
+                (sector_regulation_workflow.pk, "NOTIF_DATE")
+            ] = submission.timestamp
+        elif previous_submission is not None:
+            start_dates[
+                (sector_regulation_workflow.pk, "PREV_WORK")
+            ] = previous_submission.timestamp
+        previous_submission = submission
+
+    reminders = {}
+    for email in emails:
+        start_date = start_dates.get(
+            (email.sector_regulation_workflow_id, email.trigger_event)
+        )
+        if start_date is not None:
+            reminders[email.pk] = start_date + timedelta(hours=email.delay_in_hours)
+
+    return reminders
+
+
+def update_incident_reminders(incident, now=None):
+    """
+    Synchronize the reminders outbox with the reports of the incident.
+
+    Called when a report is submitted and when the emails of the reports are edited.
+    A reminder is sent again only when its send time moved (report submitted again).
+    Reminders already over when they are scheduled are not sent.
+    """
+    if now is None:
+        now = timezone.now()
+
+    if incident.sector_regulation is None:
+        return
+
+    existing_reminders = {
+        reminder.sector_regulation_workflow_email_id: reminder
+        for reminder in IncidentEmailReminder.objects.filter(incident=incident)
+    }
+
+    new_reminders = []
+    for email_id, send_at in get_incident_reminders(incident).items():
+        reminder = existing_reminders.pop(email_id, None)
+        sent_at = now if send_at < now - timedelta(hours=1) else None
+        if reminder is None:
+            new_reminders.append(
+                IncidentEmailReminder(
+                    incident=incident,
+                    sector_regulation_workflow_email_id=email_id,
+                    send_at=send_at,
+                    sent_at=sent_at,
+                )
+            )
+        elif reminder.send_at != send_at:
+            reminder.send_at = send_at
+            reminder.sent_at = sent_at
+            reminder.save(update_fields=["send_at", "sent_at"])
+
+    if new_reminders:
+        IncidentEmailReminder.objects.bulk_create(new_reminders, ignore_conflicts=True)
+
+    # reports submitted since and emails removed
+    if existing_reminders:
+        IncidentEmailReminder.objects.filter(
+            pk__in=[reminder.pk for reminder in existing_reminders.values()]
+        ).delete()
+
+
+def send_due_reminders(now=None):
+    """
+    Send the reminder emails due and not yet sent.
+
+    The reminders are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so several
+    workers can run at the same time and each reminder is sent once. The reminders
+    of the closed incidents are marked as sent without email.
+    Return the number of sent emails.
+    """
+    if now is None:
+        now = timezone.now()
+
+    sent = 0
+    while True:
+        with transaction.atomic():
+            reminders = list(
+                IncidentEmailReminder.objects.select_for_update(
+                    skip_locked=True, of=("self",)
+                )
+                .filter(send_at__lte=now, sent_at__isnull=True)
+                .select_related("incident", "sector_regulation_workflow_email__email")
+                .order_by("send_at")[:REMINDERS_BATCH_SIZE]
+            )
+            if not reminders:
+                return sent
+
+            IncidentEmailReminder.objects.filter(
+                pk__in=[reminder.pk for reminder in reminders]
+            ).update(sent_at=now)
+
+            # the reminders are sent by email template
+            emails = {}
+            incidents_by_email = {}
+            for reminder in reminders:
+                if reminder.incident.incident_status == "GOING":
+                    email = reminder.sector_regulation_workflow_email.email
+                    emails.setdefault(email.pk, email)
+                    incidents_by_email.setdefault(email.pk, []).append(
+                        reminder.incident
+                    )
+            for email_id, incidents in incidents_by_email.items():
+                send_emails(emails[email_id], incidents)
+                sent += len(incidents)
@@ -0,0 +1,7 @@
+from incidents.pdf_generation import build_pdf_archives
+
+
+# Script to run every minute
+# Build the ZIP archives of PDF reports queued by download_incidents_pdf.
+def run():
+    build_pdf_archives()
@@ -0,0 +1,9 @@
+from incidents.pdf_generation import purge_pdf_archives, purge_pdf_reports
+
+
+# Script to run every day
+# Remove the PDF reports not downloaded for a while and the old ZIP archives
+# from the PDF cache.
+def run():
+    purge_pdf_reports()
+    purge_pdf_archives()
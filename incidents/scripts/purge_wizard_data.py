@@ -0,0 +1,7 @@
+from incidents.wizard_storage import purge_wizard_data
+
+
+# Script to run every hour
+# Remove the data of the form wizards left unfinished.
+def run():
+    purge_wizard_data()
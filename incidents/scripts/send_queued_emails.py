@@ -0,0 +1,7 @@
+from incidents.email import send_queued_emails
+
+
+# Script to run every minute
+# Send the emails queued by send_html_email, several runs can work at the same time.
+def run():
+    send_queued_emails()
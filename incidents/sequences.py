@@ -0,0 +1,34 @@
+from django.db import transaction
+from django.db.models import F
+
+from .models import IncidentSequence
+
+
+def get_next_incident_numbers(company, year, count=1):
+    """
+    Return the next numbers of the incidents of the company in the year.
+
+    The counter row of the company and year is incremented in a single UPDATE, so
+    the row stays locked until the end of the transaction and two incidents created
+    at the same time never get the same number. The incidents without company are
+    not numbered.
+    """
+    if company is None:
+        return [0] * count
+
+    with transaction.atomic():
+        updated = IncidentSequence.objects.filter(company=company, year=year).update(
+            last_number=F("last_number") + count
+        )
+        if not updated:
+            # first incident of the year, a concurrent creation of the row waits
+            # for this transaction and is then updated
+            IncidentSequence.objects.get_or_create(company=company, year=year)
+            IncidentSequence.objects.filter(company=company, year=year).update(
+                last_number=F("last_number") + count
+            )
+        last_number = IncidentSequence.objects.values_list(
+            "last_number", flat=True
+        ).get(company=company, year=year)
+
+    return list(range(last_number - count + 1, last_number + 1))
@@ -0,0 +1,103 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from governanceplatform.caching import (
+    IMPACT_CHOICES_CACHE,
+    REGULATION_CHOICES_CACHE,
+    SECTOR_CHOICES_CACHE,
+    invalidate_cache,
+)
+
+from .deadlines import update_incident_deadlines
+from .form_schema import invalidate_workflow_schemas
+from .models import (
+    Impact,
+    Incident,
+    PredefinedAnswer,
+    PredefinedAnswerOptions,
+    Question,
+    QuestionCategory,
+    QuestionCategoryOptions,
+    QuestionOptions,
+    SectorRegulation,
+    SectorRegulationWorkflow,
+    SectorRegulationWorkflowEmail,
+    Workflow,
+)
+from .reminders import update_incident_reminders
+
+
+# the delays or the order of the reports changed,
+# reschedule the deadlines and the reminders of the open incidents of the workflow
+@receiver(post_save, sender=SectorRegulationWorkflow)
+@receiver(post_delete, sender=SectorRegulationWorkflow)
+def update_sector_regulation_deadlines(sender, instance, **kwargs):
+    incidents = Incident.objects.filter(
+        sector_regulation_id=instance.sector_regulation_id, incident_status="GOING"
+    ).select_related("sector_regulation")
+    for incident in incidents:
+        update_incident_deadlines(incident)
+        update_incident_reminders(incident)
+
+
+# the reminder emails of a report changed,
+# reschedule the reminders of the open incidents of the workflow
+@receiver(post_save, sender=SectorRegulationWorkflowEmail)
+def update_sector_regulation_reminders(sender, instance, **kwargs):
+    incidents = Incident.objects.filter(
+        sector_regulation__sectorregulationworkflow=instance.sector_regulation_workflow_id,
+        incident_status="GOING",
+    ).select_related("sector_regulation")
+    for incident in incidents:
+        update_incident_reminders(incident)
+
+
+# the questions of the reports changed, the forms of the reports are compiled again
+def update_workflow_schemas(sender, **kwargs):
+    invalidate_workflow_schemas()
+
+
+for model in [
+    Workflow,
+    Workflow._parler_meta.root_model,
+    QuestionOptions,
+    PredefinedAnswerOptions,
+    Question,
+    Question._parler_meta.root_model,
+    PredefinedAnswer,
+    PredefinedAnswer._parler_meta.root_model,
+    QuestionCategory,
+    QuestionCategory._parler_meta.root_model,
+    QuestionCategoryOptions,
+]:
+    post_save.connect(update_workflow_schemas, sender=model)
+    post_delete.connect(update_workflow_schemas, sender=model)
+
+
+# the regulations and sectors of the regulators changed,
+# the choices of the notification form are built again
+@receiver(post_save, sender=SectorRegulation)
+@receiver(post_delete, sender=SectorRegulation)
+def update_sector_regulation_choices(sender, instance, **kwargs):
+    invalidate_cache(REGULATION_CHOICES_CACHE, SECTOR_CHOICES_CACHE)
+
+
+@receiver(m2m_changed, sender=SectorRegulation.sectors.through)
+def update_sector_regulation_sectors_choices(sender, instance, action, **kwargs):
+    if action in ["post_add", "post_remove", "post_clear"]:
+        invalidate_cache(SECTOR_CHOICES_CACHE)
+
+
+# the impacts changed, the choices of the impacts form are built again
+@receiver(post_save, sender=Impact)
+@receiver(post_delete, sender=Impact)
+@receiver(post_save, sender=Impact._parler_meta.root_model)
+@receiver(post_delete, sender=Impact._parler_meta.root_model)
+def update_impact_choices(sender, instance, **kwargs):
+    invalidate_cache(IMPACT_CHOICES_CACHE)
+
+
+@receiver(m2m_changed, sender=Impact.sectors.through)
+def update_impact_sectors_choices(sender, instance, action, **kwargs):
+    if action in ["post_add", "post_remove", "post_clear"]:
+        invalidate_cache(IMPACT_CHOICES_CACHE)
@@ -138,6 +138,14 @@ def is_workflow_disabled(allWorkflows, incidentWorkflows, report):
 
 @register.simple_tag
 def is_deadline_exceeded(report, incident):
+    # use the deadlines computed for the whole page (see deadlines.py)
+    report_deadlines = getattr(incident, "report_deadlines", None)
+    if report_deadlines is not None and report is not None:
+        report_deadline = report_deadlines.get(report.id)
+        if report_deadline is not None and report_deadline.is_exceeded:
+            return _("Not submitted and deadline exceeded")
+        return _("Not submitted")
+
     if incident is not None and report is not None:
         sr_workflow = (
             SectorRegulationWorkflow.objects.all()
@@ -216,16 +224,24 @@ def is_deadline_exceeded(report, incident):
 # get the incident workflow by workflow and incident to see the historic for operator
 @register.filter
 def get_incident_workflow_by_workflow(incident, workflow):
-    queryset = (
-        IncidentWorkflow.objects.all()
-        .filter(incident=incident, workflow=workflow)
-        .order_by("-timestamp")
-    )
+    prefetched_incident_workflows = incident.get_prefetched_incident_workflows()
+    if prefetched_incident_workflows is not None:
+        data = [
+            {"id": incident_workflow.id, "timestamp": incident_workflow.timestamp}
+            for incident_workflow in prefetched_incident_workflows
+            if incident_workflow.workflow_id == workflow.id
+        ]
+    else:
+        queryset = (
+            IncidentWorkflow.objects.all()
+            .filter(incident=incident, workflow=workflow)
+            .order_by("-timestamp")
+        )
+        data = list(queryset.values("id", "timestamp"))
 
-    if not queryset:
+    if not data:
         return None
 
-    data = list(queryset.values("id", "timestamp"))
     for item in data:
         item["timestamp"] = item["timestamp"].isoformat()
 
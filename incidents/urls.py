@@ -22,15 +22,18 @@ from .views import (
     create_workflow,
     delete_incident,
     download_incident_pdf,
+    download_incident_report_pdf,
+    download_incidents_pdf,
+    download_pdf_archive,
     edit_impacts,
     edit_workflow,
     get_edit_incident_timeline_form,
     get_form_list,
     get_incidents,
     get_next_workflow,
+    get_pdf_archives,
     get_regulator_incident_edit_form,
     review_workflow,
-    download_incident_report_pdf,
 )
 
 urlpatterns = [
@@ -68,6 +71,21 @@ urlpatterns = [
         download_incident_pdf,
         name="download_incident_pdf",
     ),
+    path(
+        "download-pdf",
+        download_incidents_pdf,
+        name="download_incidents_pdf",
+    ),
+    path(
+        "pdf-archives",
+        get_pdf_archives,
+        name="pdf_archives",
+    ),
+    path(
+        "pdf-archives/<int:pdf_archive_id>",
+        download_pdf_archive,
+        name="download_pdf_archive",
+    ),
     path(
         "download-incident-report-pdf/<int:incident_workflow_id>",
         download_incident_report_pdf,
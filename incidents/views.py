@@ -2,6 +2,7 @@
 # import json
 
 from datetime import date
+from functools import partial
 from urllib.parse import urlparse
 
 import pytz
@@ -9,22 +10,24 @@ from django import forms
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
-from django.db.models import Q
-from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
+from django.db import transaction
+from django.db.models import Prefetch, Q
+from django.http import (
+    FileResponse,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, redirect, render
-from django.utils import timezone
+from django.utils.translation import get_language
 from django.utils.translation import gettext as _
 from django_countries import countries
 from django_otp.decorators import otp_required
 from formtools.wizard.views import SessionWizardView
 
 from governanceplatform.helpers import (
-    can_access_incident,
-    can_create_incident_report,
-    can_edit_incident_report,
     get_active_company_from_session,
     is_observer_user,
-    is_observer_user_viewving_all_incident,
     is_user_operator,
     is_user_regulator,
     user_in_group,
@@ -32,14 +35,22 @@ from governanceplatform.helpers import (
 from governanceplatform.models import Regulation, Regulator, Sector
 from governanceplatform.settings import (
     MAX_PRELIMINARY_NOTIFICATION_PER_DAY_PER_USER,
+    PDF_ZIP_STREAM_MAX_INCIDENTS,
     PUBLIC_URL,
     SITE_NAME,
     TIME_ZONE,
 )
 from theme.globals import REGIONAL_AREA
 
+from .access import (
+    can_access_incident,
+    can_create_incident_report,
+    can_edit_incident_report,
+    get_incident_access_rule,
+)
+from .deadlines import create_incidents_deadlines, update_incident_deadlines
 from .decorators import regulator_role_required
-from .email import send_email
+from .email import send_email, send_emails
 from .filters import IncidentFilter
 from .forms import (
     ContactForm,
@@ -51,19 +62,27 @@ from .forms import (
     RegulatorForm,
     get_forms_list,
 )
+from .incident_list import populate_incidents_page
 from .models import (
     Answer,
     Incident,
     IncidentWorkflow,
     LogReportRead,
-    PredefinedAnswerOptions,
+    PdfArchive,
     QuestionCategory,
     QuestionOptions,
     SectorRegulation,
     SectorRegulationWorkflow,
     Workflow,
 )
-from .pdf_generation import get_pdf_report
+from .pdf_generation import (
+    get_pdf_archive_path,
+    get_pdf_report_file,
+    invalidate_pdf_reports,
+    stream_pdf_reports_zip,
+)
+from .reminders import update_incident_reminders
+from .sequences import get_next_incident_numbers
 
 
 @login_required
@@ -71,7 +90,9 @@ from .pdf_generation import get_pdf_report
 def get_incidents(request):
     """Returns the list of incidents depending on the account type."""
     user = request.user
-    incidents = Incident.objects.order_by("-incident_notification_date")
+    incidents = Incident.objects.select_related("sector_regulation").order_by(
+        "-incident_notification_date"
+    )
 
     # Save filter params in user's session
 
@@ -85,48 +106,10 @@ def get_incidents(request):
 
     filter_params = request.session.get("filter_params", request.GET)
 
-    if is_user_regulator(user):
-        # Filter incidents by regulator
-
-        incidents = incidents.filter(
-            sector_regulation__regulator__in=user.regulators.all()
-        )
-        if user_in_group(user, "RegulatorUser"):
-            # RegulatorUser has access to all incidents linked by sectors.
-            incidents = incidents.filter(
-                affected_sectors__in=request.user.get_sectors().all()
-            ).distinct()
-        for incident in incidents:
-            incident.formsWorkflow = []
-            for workflow_completed in incident.get_workflows_completed():
-                incident.formsWorkflow.append(
-                    IncidentWorkflowForm(instance=workflow_completed)
-                )
-            incident.formsStatus = IncidentStatusForm(
-                instance=incident,
-            )
-
-        f = IncidentFilter(filter_params, queryset=incidents)
-    elif user_in_group(user, "OperatorAdmin"):
-        # OperatorAdmin can see all the reports of the selected company.
-        incidents = incidents.filter(company__id=request.session.get("company_in_use"))
-        f = IncidentFilter(filter_params, queryset=incidents)
-    elif is_observer_user_viewving_all_incident(user):
-        incidents = Incident.objects.all().order_by("-incident_notification_date")
-        f = IncidentFilter(filter_params, queryset=incidents)
-    elif user_in_group(user, "OperatorUser"):
-        # OperatorUser see his incident and the one oh his sectors for the company
-        query1 = incidents.filter(
-            company__id=request.session.get("company_in_use"),
-            affected_sectors__in=user.sectors.all(),
-        )
-        query2 = incidents.filter(contact_user=user)
-        incidents = (query1 | query2).distinct()
-        f = IncidentFilter(filter_params, queryset=incidents)
-    else:
-        # OperatorUser and IncidentUser can see only their reports.
-        incidents = incidents.filter(contact_user=user)
-        f = IncidentFilter(filter_params, queryset=incidents)
+    incidents = incidents.filter(
+        get_incident_access_rule(user, request.session.get("company_in_use"))
+    )
+    f = IncidentFilter(filter_params, queryset=incidents)
 
     if request.GET.get("incidentId"):
         # Search by incident id
@@ -145,6 +128,9 @@ def get_incidents(request):
     except EmptyPage:
         response = paginator.page(paginator.num_pages)
 
+    # load the reports and forms only for the incidents of the page
+    response.object_list = populate_incidents_page(response.object_list)
+
     # add paggination to the regular incidents view.
     html_view = "operator/incidents.html"
     if is_user_regulator(request.user):
@@ -417,6 +403,7 @@ def get_regulator_incident_edit_form(request, incident_id: int):
                                 incident,
                             )
                 workflow.save()
+                invalidate_pdf_reports(incident)
 
             return JsonResponse(response)
 
@@ -447,6 +434,8 @@ def get_regulator_incident_edit_form(request, incident_id: int):
                         incident_form.initial[field_name],
                     )
             incident.save()
+            update_incident_deadlines(incident)
+            invalidate_pdf_reports(incident)
 
     return JsonResponse(response)
 
@@ -488,6 +477,8 @@ def get_edit_incident_timeline_form(request, incident_id: int):
     if request.method == "POST":
         if incident_date_form.is_valid():
             incident_date_form.save()
+            update_incident_deadlines(incident)
+            invalidate_pdf_reports(incident)
             messages.success(
                 request,
                 f"Incident {incident.incident_id} has been successfully saved.",
@@ -548,7 +539,7 @@ def download_incident_pdf(request, incident_id: int):
         return redirect("incidents")
     else:
         try:
-            pdf_report = get_pdf_report(incident, None, request)
+            pdf_report_file = get_pdf_report_file(incident, None, request)
             create_entry_log(user, incident, None, "DOWNLOAD")
         except Exception:
             messages.warning(
@@ -556,12 +547,12 @@ def download_incident_pdf(request, incident_id: int):
             )
             return HttpResponseRedirect("/incidents")
 
-        response = HttpResponse(pdf_report, content_type="application/pdf")
-        response[
-            "Content-Disposition"
-        ] = f"attachment;filename=Incident_{incident_id}_{date.today()}.pdf"
-
-        return response
+        return FileResponse(
+            pdf_report_file,
+            as_attachment=True,
+            filename=f"Incident_{incident_id}_{date.today()}.pdf",
+            content_type="application/pdf",
+        )
 
 
 @login_required
@@ -577,7 +568,7 @@ def download_incident_report_pdf(request, incident_workflow_id: int):
         return redirect("incidents")
     else:
         try:
-            pdf_report = get_pdf_report(incident, incident_workflow, request)
+            pdf_report_file = get_pdf_report_file(incident, incident_workflow, request)
             create_entry_log(user, incident, incident_workflow, "DOWNLOAD")
         except Exception:
             messages.warning(
@@ -585,12 +576,91 @@ def download_incident_report_pdf(request, incident_workflow_id: int):
             )
             return HttpResponseRedirect("/incidents")
 
-        response = HttpResponse(pdf_report, content_type="application/pdf")
-        response[
-            "Content-Disposition"
-        ] = f"attachment;filename=Incident_{incident_workflow}_{date.today()}.pdf"
+        return FileResponse(
+            pdf_report_file,
+            as_attachment=True,
+            filename=f"Incident_{incident_workflow}_{date.today()}.pdf",
+            content_type="application/pdf",
+        )
 
-        return response
+
+@login_required
+@otp_required
+@regulator_role_required
+def download_incidents_pdf(request):
+    """Returns the PDF reports of the filtered incidents in a ZIP archive."""
+    user = request.user
+    incidents = (
+        Incident.objects.filter(get_incident_access_rule(user))
+        .select_related("sector_regulation")
+        .order_by("-incident_notification_date")
+    )
+
+    # same selection as the incidents list
+    filter_params = request.session.get("filter_params", request.GET)
+    incident_list = IncidentFilter(filter_params, queryset=incidents).qs
+
+    # the reports of a large selection are rendered by the build_pdf_archives script
+    incident_ids = list(dict.fromkeys(incident_list.values_list("pk", flat=True)))
+    if len(incident_ids) > PDF_ZIP_STREAM_MAX_INCIDENTS:
+        PdfArchive.objects.create(
+            user=user, incident_ids=incident_ids, language=get_language()
+        )
+        messages.info(
+            request,
+            _(
+                "The archive of the reports is being prepared, it can be downloaded on this page once ready."
+            ),
+        )
+        return redirect("pdf_archives")
+
+    response = StreamingHttpResponse(
+        stream_pdf_reports_zip(
+            incident_list.iterator(),
+            request,
+            on_report=lambda incident: create_entry_log(
+                user, incident, None, "DOWNLOAD"
+            ),
+        ),
+        content_type="application/zip",
+    )
+    response[
+        "Content-Disposition"
+    ] = f"attachment;filename=Incidents_{date.today()}.zip"
+
+    return response
+
+
+@login_required
+@otp_required
+@regulator_role_required
+def get_pdf_archives(request):
+    """Returns the list of the archives of PDF reports of the user."""
+    pdf_archives = PdfArchive.objects.filter(user=request.user).order_by("-created_at")
+    return render(
+        request, "regulator/pdf_archives.html", {"pdf_archives": pdf_archives}
+    )
+
+
+@login_required
+@otp_required
+@regulator_role_required
+def download_pdf_archive(request, pdf_archive_id: int):
+    pdf_archive = get_object_or_404(
+        PdfArchive, pk=pdf_archive_id, user=request.user, finished_at__isnull=False
+    )
+    try:
+        archive_file = open(get_pdf_archive_path(pdf_archive), "rb")
+    except FileNotFoundError:
+        messages.warning(request, _("The archive is not available anymore."))
+        return redirect("pdf_archives")
+
+    return FileResponse(
+        archive_file,
+        as_attachment=True,
+        filename=f"Incidents_{pdf_archive.created_at.date()}.zip",
+        content_type="application/zip",
+    )
 
 
 @login_required
@@ -727,6 +797,7 @@ class FormWizardView(SessionWizardView):
     """Wizard to manage the preliminary form."""
 
     template_name = "declaration.html"
+    storage_name = "incidents.wizard_storage.DatabaseStorage"
 
     def __init__(self, **kwargs):
         self.form_list = kwargs.pop("form_list")
@@ -800,7 +871,7 @@ class FormWizardView(SessionWizardView):
         regulators_id = extract_ids(data.get("regulators", []))
         regulations_id = extract_ids(data.get("regulations", []))
 
-        sector_regulations = (
+        sector_regulations = list(
             SectorRegulation.objects.filter(
                 Q(sectors__in=sectors_id) | Q(sectors__isnull=True),
                 regulator__in=regulators_id,
@@ -808,7 +879,20 @@ class FormWizardView(SessionWizardView):
             )
             .order_by()
             .distinct()
+            .select_related("opening_email")
+            .prefetch_related(
+                Prefetch("sectors", queryset=Sector.objects.select_related("parent")),
+                Prefetch(
+                    "sectorregulationworkflow_set",
+                    queryset=SectorRegulationWorkflow.objects.select_related(
+                        "workflow"
+                    ).order_by("position"),
+                    to_attr="prefetched_sector_regulation_workflows",
+                ),
+            )
         )
+        if not sector_regulations:
+            return HttpResponseRedirect("/incidents")
 
         incident_timezone = data.get("incident_timezone", TIME_ZONE)
         incident_detection_date = data.get("detection_date", None)
@@ -818,60 +902,20 @@ class FormWizardView(SessionWizardView):
             local_dt = local_tz.localize(incident_detection_date.replace(tzinfo=None))
             incident_detection_date = local_dt.astimezone(pytz.utc)
 
-        for sector_regulation in sector_regulations:
-            incident = Incident.objects.create(
-                contact_lastname=data.get("contact_lastname"),
-                contact_firstname=data.get("contact_firstname"),
-                contact_title=data.get("contact_title"),
-                contact_email=data.get("contact_email"),
-                contact_telephone=data.get("contact_telephone"),
-                # technical contact
-                technical_lastname=data.get("technical_lastname"),
-                technical_firstname=data.get("technical_firstname"),
-                technical_title=data.get("technical_title"),
-                technical_email=data.get("technical_email"),
-                technical_telephone=data.get("technical_telephone"),
-                incident_reference=data.get("incident_reference"),
-                complaint_reference=data.get("complaint_reference"),
-                contact_user=user,
-                company=company,
-                company_name=company.name if company else data.get("company_name"),
-                sector_regulation=sector_regulation,
-                incident_timezone=data.get("incident_timezone", TIME_ZONE),
-                incident_detection_date=incident_detection_date,
-            )
-            if incident:
-                # check if the detection date is over
-                if sector_regulation.is_detection_date_needed:
-                    sr_workflow = (
-                        SectorRegulationWorkflow.objects.all()
-                        .filter(
-                            sector_regulation=sector_regulation,
-                        )
-                        .order_by("position")
-                        .first()
-                    )
-
-                    if sr_workflow.trigger_event_before_deadline == "DETECT_DATE":
-                        dt = timezone.now() - incident.incident_detection_date
-                        if (
-                            round(dt.total_seconds() / 60 / 60, 0)
-                            > sr_workflow.delay_in_hours_before_deadline
-                        ):
-                            sr_workflow.review_status = "OUT"
-                            sr_workflow.save()
-
-                sec = sector_regulation.sectors.values_list("id", flat=True)
-                selected_sectors = Sector.objects.filter(id__in=sectors_id).values_list(
-                    "id", flat=True
-                )
-                affected_sectors = selected_sectors & sec
-                incident.affected_sectors.set(affected_sectors)
-                # incident reference
+        # incident reference
+        company_for_ref = (
+            company.identifier if company else data.get("company_name", "")[:4]
+        )
+        year = date.today().year
 
-                company_for_ref = (
-                    company.identifier if company else data.get("company_name", "")[:4]
-                )
+        with transaction.atomic():
+            incident_numbers = get_next_incident_numbers(
+                company, year, len(sector_regulations)
+            )
+            incidents = []
+            for sector_regulation, incident_number in zip(
+                sector_regulations, incident_numbers
+            ):
                 sector_for_ref = ""
                 subsector_for_ref = ""
 
@@ -882,26 +926,75 @@ class FormWizardView(SessionWizardView):
                             if sector.parent:
                                 sector_for_ref = sector.parent.acronym[:3]
 
-                incidents_per_company = (
-                    company.incident_set.filter(
-                        incident_notification_date__year=date.today().year
-                    ).count()
-                    if company
-                    else 0
-                )
-                number_of_incident = f"{incidents_per_company:04}"
-                incident.incident_id = (
-                    f"{company_for_ref}_{sector_for_ref}_{subsector_for_ref}_"
-                    f"{number_of_incident}_{date.today().year}"
+                number_of_incident = f"{incident_number:04}"
+                incident = Incident(
+                    incident_id=(
+                        f"{company_for_ref}_{sector_for_ref}_{subsector_for_ref}_"
+                        f"{number_of_incident}_{year}"
+                    ),
+                    contact_lastname=data.get("contact_lastname"),
+                    contact_firstname=data.get("contact_firstname"),
+                    contact_title=data.get("contact_title"),
+                    contact_email=data.get("contact_email"),
+                    contact_telephone=data.get("contact_telephone"),
+                    # technical contact
+                    technical_lastname=data.get("technical_lastname"),
+                    technical_firstname=data.get("technical_firstname"),
+                    technical_title=data.get("technical_title"),
+                    technical_email=data.get("technical_email"),
+                    technical_telephone=data.get("technical_telephone"),
+                    incident_reference=data.get("incident_reference"),
+                    complaint_reference=data.get("complaint_reference"),
+                    contact_user=user,
+                    company=company,
+                    company_name=company.name if company else data.get("company_name"),
+                    sector_regulation=sector_regulation,
+                    incident_timezone=data.get("incident_timezone", TIME_ZONE),
+                    incident_detection_date=incident_detection_date,
                 )
+                # no report submitted yet
+                incident.prefetched_incident_workflows = []
+                incidents.append(incident)
 
-                incident.save()
+            Incident.objects.bulk_create(incidents)
 
-                create_entry_log(user, incident, None, "COMMENT")
+            Incident.affected_sectors.through.objects.bulk_create(
+                [
+                    Incident.affected_sectors.through(
+                        incident_id=incident.id, sector_id=sector.id
+                    )
+                    for incident in incidents
+                    for sector in incident.sector_regulation.sectors.all()
+                    if sector.id in sectors_id
+                ]
+            )
+            # queue the deadlines, a detection date already over the deadline
+            # is processed by the next workflow_update_status run
+            create_incidents_deadlines(incidents)
+
+            LogReportRead.objects.bulk_create(
+                [
+                    LogReportRead(
+                        user=user,
+                        user_full_name=user.get_full_name(),
+                        incident=incident,
+                        incident_report=None,
+                        action="COMMENT",
+                    )
+                    for incident in incidents
+                ]
+            )
 
-                # send The email notification opening
-                if sector_regulation.opening_email is not None:
-                    send_email(sector_regulation.opening_email, incident)
+            # send the email notification opening once the incidents are saved
+            incidents_by_email = {}
+            for incident in incidents:
+                opening_email = incident.sector_regulation.opening_email
+                if opening_email is not None:
+                    incidents_by_email.setdefault(opening_email, []).append(incident)
+            for opening_email, email_incidents in incidents_by_email.items():
+                transaction.on_commit(
+                    partial(send_emails, opening_email, email_incidents)
+                )
 
         return HttpResponseRedirect("/incidents")
 
@@ -910,6 +1003,7 @@ class WorkflowWizardView(SessionWizardView):
     """Wizard to manage the different workflows."""
 
     template_name = "declaration.html"
+    storage_name = "incidents.wizard_storage.DatabaseStorage"
     incident = None
     workflow = None
     incident_workflow = None
@@ -1052,8 +1146,10 @@ class WorkflowWizardView(SessionWizardView):
             category_ids = self.workflow.questionoptions_set.values_list(
                 "category", flat=True
             ).distinct()
-            categories = QuestionCategory.objects.filter(id__in=category_ids).order_by(
-                "questioncategoryoptions__position"
+            categories = (
+                QuestionCategory.objects.filter(id__in=category_ids)
+                .order_by("questioncategoryoptions__position")
+                .prefetch_translations()
             )
 
             context["steps"].append(_("Timeline"))
@@ -1109,6 +1205,8 @@ class WorkflowWizardView(SessionWizardView):
             self.incident.save()
             # manage question
             incident_workflow = save_answers(data, self.incident, self.workflow)
+            update_incident_deadlines(self.incident)
+            update_incident_reminders(self.incident)
             create_entry_log(user, self.incident, incident_workflow, "CREATE")
 
             if email:
@@ -1123,6 +1221,7 @@ class WorkflowWizardView(SessionWizardView):
             )
             incident_workflow.comment = data.get("comment", None)
             incident_workflow.save()
+            invalidate_pdf_reports(self.incident)
             create_entry_log(
                 user, incident_workflow.incident, incident_workflow, "COMMENT"
             )
@@ -1130,6 +1229,7 @@ class WorkflowWizardView(SessionWizardView):
         return HttpResponseRedirect("/incidents")
 
 
+@transaction.atomic
 def save_answers(data=None, incident=None, workflow=None):
     """Save the answers."""
     prefix = "__question__"
@@ -1141,10 +1241,8 @@ def save_answers(data=None, incident=None, workflow=None):
 
     # We create a new incident workflow in all the case (history)
     incident_workflow = IncidentWorkflow.objects.create(
-        incident=incident, workflow=workflow
+        incident=incident, workflow=workflow, review_status="DELIV"
     )
-    incident_workflow.review_status = "DELIV"
-    incident_workflow.save()
     # TO DO manage impact
     if workflow.is_impact_needed:
         impacts = data.get("impacts", [])
@@ -1157,6 +1255,7 @@ def save_answers(data=None, incident=None, workflow=None):
 
         incident.save()
 
+    question_values = {}
     for key, value in questions_data.items():
         question_id = None
         try:
@@ -1164,37 +1263,66 @@ def save_answers(data=None, incident=None, workflow=None):
         except Exception:
             pass
         if question_id:
-            predefined_answer_options = []
-            question_option = QuestionOptions.objects.get(pk=key)
-            question = question_option.question
-            question_type = question.question_type
-
-            if question_type == "FREETEXT":
-                answer = value
-            elif question_type == "DATE":
-                if value:
-                    answer = value.strftime("%Y-%m-%d %H:%M")
-                else:
-                    answer = None
-            elif question_type == "CL" or question_type == "RL":
-                answer = ""
-                for val in value:
-                    answer += val + ","
-                answer = answer
-            else:  # MULTI
-                for val in value:
-                    predefined_answer_options.append(
-                        PredefinedAnswerOptions.objects.get(pk=val)
-                    )
+            question_values[question_id] = (key, value)
+
+    # the question options are fetched at once, the predefined answers are already
+    # validated by the form choices (and by the foreign key at the insertion)
+    question_options = QuestionOptions.objects.select_related("question").in_bulk(
+        question_values.keys()
+    )
+
+    answers = []
+    answers_predefined_answer_options = []
+    for question_id, (key, value) in question_values.items():
+        question_option = question_options.get(question_id)
+        if question_option is None:
+            raise QuestionOptions.DoesNotExist(f"Question options {key} not found.")
+        predefined_answer_options = []
+        question_type = question_option.question.question_type
+
+        if question_type == "FREETEXT":
+            answer = value
+        elif question_type == "DATE":
+            if value:
+                answer = value.strftime("%Y-%m-%d %H:%M")
+            else:
                 answer = None
-                if questions_data.get(key + "_answer", None):
-                    answer = questions_data.get(key + "_answer")
-            answer_object = Answer.objects.create(
+        elif question_type == "CL" or question_type == "RL":
+            answer = ""
+            for val in value:
+                answer += val + ","
+            answer = answer
+        else:  # MULTI
+            for val in value:
+                predefined_answer_options.append(int(val))
+            answer = None
+            if questions_data.get(key + "_answer", None):
+                answer = questions_data.get(key + "_answer")
+        answers.append(
+            Answer(
                 incident_workflow=incident_workflow,
                 question_options=question_option,
                 answer=answer,
             )
-            answer_object.predefined_answer_options.set(predefined_answer_options)
+        )
+        answers_predefined_answer_options.append(predefined_answer_options)
+
+    Answer.objects.bulk_create(answers)
+    AnswerPredefinedAnswerOptions = Answer.predefined_answer_options.through
+    AnswerPredefinedAnswerOptions.objects.bulk_create(
+        [
+            AnswerPredefinedAnswerOptions(
+                answer_id=answer.pk,
+                predefinedansweroptions_id=predefined_answer_option_id,
+            )
+            for answer, predefined_answer_options in zip(
+                answers, answers_predefined_answer_options
+            )
+            for predefined_answer_option_id in predefined_answer_options
+        ]
+    )
+
+    invalidate_pdf_reports(incident)
 
     return incident_workflow
 
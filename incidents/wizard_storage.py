@@ -0,0 +1,157 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from formtools.wizard.storage.base import BaseStorage
+
+from .models import WizardStepData
+
+# step of the row keeping the current step, the files and the extra data
+META_STEP = ""
+# posted values not needed to validate the forms again
+IGNORED_FIELDS = ["csrfmiddlewaretoken"]
+
+
+# the wizard instance is the incident and the report edited
+def get_wizard_instance(request):
+    values = []
+    for attribute in ["incident", "workflow", "incident_workflow"]:
+        value = getattr(request, attribute, None)
+        values.append(str(getattr(value, "pk", value) or ""))
+    return "-".join(values)
+
+
+def compact_step_data(step_data):
+    # a list with one value is stored as the value
+    return {
+        key: values[0] if len(values) == 1 else values
+        for key, values in step_data.items()
+        if key not in IGNORED_FIELDS
+    }
+
+
+def expand_step_data(step_data):
+    return {
+        key: values if isinstance(values, list) else [values]
+        for key, values in step_data.items()
+    }
+
+
+# remove the data of the wizards not used since the end of the session,
+# called by the purge_wizard_data script
+def purge_wizard_data(now: Optional[datetime] = None) -> int:
+    if now is None:
+        now = timezone.now()
+    limit = now - timedelta(seconds=settings.SESSION_COOKIE_AGE)
+
+    # the steps of a wizard still in use are kept, even the ones not changed lately
+    recent_rows = WizardStepData.objects.filter(
+        user=OuterRef("user"),
+        wizard=OuterRef("wizard"),
+        instance=OuterRef("instance"),
+        updated_at__gte=limit,
+    )
+    deleted, _ = (
+        WizardStepData.objects.filter(updated_at__lt=limit)
+        .exclude(Exists(recent_rows))
+        .delete()
+    )
+    return deleted
+
+
+class DatabaseStorage(BaseStorage):
+    """
+    Wizard storage keeping the data in the WizardStepData table instead of the
+    session.
+
+    There is one row by step, keyed by user, wizard and wizard instance, so several
+    reports can be filled at the same time. Only the changed steps are written at
+    the end of the request.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.instance = get_wizard_instance(self.request)
+        self._data = None
+        self.changed_steps = set()
+        self.is_reset = False
+
+    def get_rows(self):
+        return WizardStepData.objects.filter(
+            user=self.request.user, wizard=self.prefix, instance=self.instance
+        )
+
+    def _get_data(self):
+        if self._data is None:
+            self._data = {
+                self.step_key: None,
+                self.step_data_key: {},
+                self.step_files_key: {},
+                self.extra_data_key: {},
+            }
+            for step, data in self.get_rows().values_list("step", "data"):
+                if step == META_STEP:
+                    self._data[self.step_key] = data.get(self.step_key)
+                    self._data[self.step_files_key] = data.get(self.step_files_key, {})
+                    self._data[self.extra_data_key] = data.get(self.extra_data_key, {})
+                else:
+                    self._data[self.step_data_key][step] = expand_step_data(data)
+        return self._data
+
+    def _set_data(self, value):
+        self._data = value
+
+    data = property(_get_data, _set_data)
+
+    def init_data(self):
+        super().init_data()
+        self.changed_steps = set()
+        self.is_reset = True
+
+    def _set_current_step(self, step):
+        super()._set_current_step(step)
+        self.changed_steps.add(META_STEP)
+
+    def _get_extra_data(self):
+        # the extra data can be changed in place
+        self.changed_steps.add(META_STEP)
+        return super()._get_extra_data()
+
+    def _set_extra_data(self, extra_data):
+        super()._set_extra_data(extra_data)
+        self.changed_steps.add(META_STEP)
+
+    def set_step_data(self, step, cleaned_data):
+        super().set_step_data(step, cleaned_data)
+        self.changed_steps.add(step)
+
+    def set_step_files(self, step, files):
+        super().set_step_files(step, files)
+        if files:
+            self.changed_steps.add(META_STEP)
+
+    def update_response(self, response):
+        super().update_response(response)
+
+        if self.is_reset:
+            self.get_rows().delete()
+        for step in self.changed_steps:
+            if step == META_STEP:
+                data = {
+                    self.step_key: self.data[self.step_key],
+                    self.step_files_key: self.data[self.step_files_key],
+                    self.extra_data_key: self.data[self.extra_data_key],
+                }
+            else:
+                data = compact_step_data(self.data[self.step_data_key][step])
+            WizardStepData.objects.update_or_create(
+                user=self.request.user,
+                wizard=self.prefix,
+                instance=self.instance,
+                step=step,
+                defaults={"data": data},
+            )
+        self.changed_steps = set()
+        self.is_reset = False